@@ -0,0 +1,251 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Local directory for cached results; override with CKM_CACHE_DIR
+CACHE_DIR = os.environ.get("CKM_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+# Total size allowed on disk before the least recently used entries are evicted
+CACHE_MAX_BYTES = int(os.environ.get("CKM_CACHE_MAX_BYTES", 512 * 1024 ** 2))
+
+# RAM budget of the in-process cache shared by every Streamlit session; override with CKM_MEMORY_CACHE_BYTES
+MEMORY_CACHE_MAX_BYTES = int(os.environ.get("CKM_MEMORY_CACHE_BYTES", 1024 ** 3))
+
+# key -> (value, size in bytes), least recently used first
+_memory = OrderedDict()
+_memory_bytes = 0
+_memory_lock = threading.Lock()
+
+# key -> lock held while the value is being computed, so concurrent sessions compute it once
+_computing = {}
+
+
+def make_key(*parts):
+    """
+    Build a content-addressed cache key.
+
+    Parameters:
+    - parts: Values identifying the result, e.g. a data fingerprint, date range and mining parameters.
+
+    Returns:
+    - key: Hex digest of the parts.
+    """
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, f"{key}.pkl")
+
+
+def load(key):
+    """
+    Load a cached value and mark it as recently used.
+
+    Parameters:
+    - key: Key from make_key.
+
+    Returns:
+    - value: The cached object, or None when the key is not cached.
+    """
+    path = _path(key)
+    try:
+        value = pd.read_pickle(path)
+    except (FileNotFoundError, EOFError):
+        return None
+    # The modification time doubles as the last access time for LRU eviction
+    now = time.time()
+    try:
+        os.utime(path, (now, now))
+    except FileNotFoundError:
+        # Evicted by another thread's store() after we read it; the value we hold is still valid
+        pass
+    return value
+
+
+def store(key, value):
+    """
+    Save a value (DataFrames, rules, basket matrices or a dict of them) and evict old entries.
+
+    Parameters:
+    - key: Key from make_key.
+    - value: Picklable object to cache.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.to_pickle(value, tmp_path)
+    os.replace(tmp_path, path)
+    evict()
+
+
+def evict(max_bytes=None):
+    """
+    Remove least recently used entries until the cache fits in max_bytes.
+
+    Parameters:
+    - max_bytes: Size budget in bytes (default is CACHE_MAX_BYTES).
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        entries = [entry for entry in os.scandir(CACHE_DIR) if entry.name.endswith(".pkl")]
+    except FileNotFoundError:
+        return
+
+    stats = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries)
+    total = sum(size for _, size, _ in stats)
+    for _, size, path in stats:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def sizeof(value):
+    """
+    Approximate memory footprint of a cached value.
+
+    Parameters:
+    - value: DataFrame, Series, NumPy array, Plotly figure, or a dict/list/tuple of them.
+
+    Returns:
+    - size: Size in bytes.
+    """
+    if hasattr(value, 'to_plotly_json'):
+        # Plotly figures keep their data in nested dicts; the JSON sent to the browser is a fair measure
+        return len(value.to_json())
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def memory_get(key):
+    """
+    Look up a value in the shared in-memory cache and mark it as recently used.
+
+    Parameters:
+    - key: Key from make_key.
+
+    Returns:
+    - value: The cached object (shared, do not modify it), or None when the key is not cached.
+    """
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        _memory.move_to_end(key)
+        return entry[0]
+
+
+def memory_put(key, value):
+    """
+    Put a value in the shared in-memory cache, evicting least recently used entries over budget.
+
+    Values larger than MEMORY_CACHE_MAX_BYTES are not kept.
+
+    Parameters:
+    - key: Key from make_key.
+    - value: Object to share between sessions.
+    """
+    global _memory_bytes
+    size = sizeof(value)
+    with _memory_lock:
+        if key in _memory:
+            _memory_bytes -= _memory.pop(key)[1]
+        if size > MEMORY_CACHE_MAX_BYTES:
+            return
+        _memory[key] = (value, size)
+        _memory_bytes += size
+        while _memory_bytes > MEMORY_CACHE_MAX_BYTES:
+            _, (_, evicted_size) = _memory.popitem(last=False)
+            _memory_bytes -= evicted_size
+
+
+def memory_usage():
+    """
+    Report the shared in-memory cache size.
+
+    Returns:
+    - usage: Dict with 'entries', 'bytes' and 'max_bytes'.
+    """
+    with _memory_lock:
+        return {'entries': len(_memory), 'bytes': _memory_bytes, 'max_bytes': MEMORY_CACHE_MAX_BYTES}
+
+
+def _single_flight(key, lookup, compute):
+    value = lookup(key)
+    if value is not None:
+        return value
+    with _memory_lock:
+        key_lock = _computing.setdefault(key, threading.Lock())
+    with key_lock:
+        try:
+            # Another session may have finished the same computation while we waited
+            value = lookup(key)
+            if value is None:
+                value = compute()
+            return value
+        finally:
+            with _memory_lock:
+                _computing.pop(key, None)
+
+
+def shared(key, compute):
+    """
+    Return the value for key from the shared in-memory cache, computing it once on a miss.
+
+    Every session asking for the same key gets the same object, so callers must not modify it.
+
+    Parameters:
+    - key: Key from make_key.
+    - compute: Function without arguments producing the value.
+
+    Returns:
+    - value: Shared cached or freshly computed value.
+    """
+    def compute_and_share():
+        value = compute()
+        memory_put(key, value)
+        return value
+
+    return _single_flight(key, memory_get, compute_and_share)
+
+
+def cached(key, compute):
+    """
+    Return the cached value for key, computing and storing it on a miss.
+
+    Values are looked up in the shared in-memory cache first, then on disk, and are
+    computed once even when several sessions ask for them at the same time.
+
+    Parameters:
+    - key: Key from make_key.
+    - compute: Function without arguments producing the value.
+
+    Returns:
+    - value: Cached or freshly computed value (shared between sessions, do not modify it).
+    """
+    def load_or_compute():
+        value = load(key)
+        if value is None:
+            value = compute()
+            store(key, value)
+        memory_put(key, value)
+        return value
+
+    return _single_flight(key, memory_get, load_or_compute)
@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Background threads running mining jobs, shared by every session of the Streamlit process
+JOB_WORKERS = int(os.environ.get("CKM_JOB_WORKERS", 2))
+
+# Seconds a finished job (and its result) stays available for polling
+JOB_TTL = int(os.environ.get("CKM_JOB_TTL", 3600))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="ckm-job")
+_jobs = {}
+_lock = threading.Lock()
+
+
+class Job:
+    """State of one background job: status, latest progress, and result or error."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.status = "pending"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def update(self, **progress):
+        """Progress callback handed to the job function; merges keyword updates."""
+        with self._lock:
+            self.progress = {**self.progress, **progress}
+
+    def snapshot(self):
+        """Copy of the current progress, safe to read from the UI thread."""
+        with self._lock:
+            return dict(self.progress)
+
+
+def _run(job, fn, args, kwargs):
+    job.status = "running"
+    try:
+        result, error, status = fn(*args, progress=job.update, **kwargs), None, "done"
+    except Exception as exc:
+        result, error, status = None, exc, "failed"
+    # Finish under the registry lock so _prune never sees a done job without finished_at
+    with _lock:
+        job.result, job.error = result, error
+        job.finished_at = time.time()
+        job.status = status
+
+
+def _prune(now):
+    expired = [job_id for job_id, job in _jobs.items()
+               if job.done and job.finished_at is not None and now - job.finished_at > JOB_TTL]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def submit(job_id, fn, *args, **kwargs):
+    """
+    Run fn in the background unless a job with the same ID is already queued, running or done.
+
+    Parameters:
+    - job_id: Key identifying the work, e.g. cache.make_key of the data fingerprint and parameters.
+      Concurrent users submitting the same key share a single job.
+    - fn: Function called as fn(*args, progress=callback, **kwargs); callback takes keyword updates.
+
+    Returns:
+    - job: The new or existing Job.
+    """
+    with _lock:
+        _prune(time.time())
+        job = _jobs.get(job_id)
+        if job is not None and job.status != "failed":
+            return job
+        job = Job(job_id)
+        _jobs[job_id] = job
+    _executor.submit(_run, job, fn, args, kwargs)
+    return job
+
+
+def get(job_id):
+    """
+    Look up a job by ID.
+
+    Parameters:
+    - job_id: Key passed to submit.
+
+    Returns:
+    - job: The Job, or None when it is unknown or expired.
+    """
+    with _lock:
+        return _jobs.get(job_id)
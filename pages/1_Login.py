@@ -1,6 +1,13 @@
+import time
+import threading
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
+import storage
+
+# Seconds before the cached user directory is reloaded from storage
+USER_DIRECTORY_TTL = 300
+
+# Minimum seconds between reloads triggered by an unknown user (e.g. a newly added account)
+USER_DIRECTORY_MISS_REFRESH = 30
 
 # Configure the page settings
 st.set_page_config(
@@ -78,23 +85,44 @@ def set_page_style():
         </style>
     """, unsafe_allow_html=True)
 
-# Function to load Google Sheets credentials
-def load_gspread_credentials():
-    creds_info = st.secrets["gcp_service_account"]
-    scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-    creds = Credentials.from_service_account_info(creds_info, scopes=scope)
-    return gspread.authorize(creds)
-
-# Function to verify login credentials against Google Sheets data
-def verify_login(sheet, username, password):
-    user_data = sheet.get_all_records()  
-    for row in user_data:
-        if (row["Email"] == username or row["Username"] == username) and row["Password"] == password:
-            return True
-    return False
+# Function to create the configured storage backend (Google Sheets or local users.csv), shared by every session
+@st.cache_resource
+def load_storage():
+    if storage.STORAGE_BACKEND == "bigquery":
+        return storage.get_storage(credentials_info=st.secrets["gcp_service_account"])
+    return storage.get_storage()
+
+# Process-wide user directory: email/username -> passwords, filled from storage on demand
+@st.cache_resource
+def get_user_directory():
+    return {"users": {}, "loaded_at": 0.0, "lock": threading.Lock()}
+
+# Function to reload the user directory unless another session refreshed it meanwhile
+def refresh_user_directory(store, directory, max_age):
+    with directory["lock"]:
+        if time.time() - directory["loaded_at"] < max_age:
+            return
+        users = {}
+        for row in store.load_users():
+            for key in {row["Email"], row["Username"]}:
+                users.setdefault(key, []).append(row["Password"])
+        directory["users"] = users
+        directory["loaded_at"] = time.time()
+
+# Function to verify login credentials against the cached user accounts
+def verify_login(store, username, password):
+    directory = get_user_directory()
+    refresh_user_directory(store, directory, USER_DIRECTORY_TTL)
+
+    passwords = directory["users"].get(username)
+    if passwords is None:
+        # Unknown user: the account may have been added after the last reload
+        refresh_user_directory(store, directory, USER_DIRECTORY_MISS_REFRESH)
+        passwords = directory["users"].get(username, [])
+    return password in passwords
 
 # Function to display the login form and handle submission
-def display_login_form(sheet):
+def display_login_form(store):
     with st.container():
         st.markdown("<div class='main-container'>", unsafe_allow_html=True)
 
@@ -119,7 +147,7 @@ def display_login_form(sheet):
             submit_button = st.form_submit_button(label="Login", help="Click to login")
 
             if submit_button:
-                if verify_login(sheet, username, password):
+                if verify_login(store, username, password):
                     st.session_state["logged_in"] = True
                     st.success("Login successful! Redirecting...")
                     st.switch_page("pages/Customer_Knowledge_Management.py")
@@ -145,14 +173,11 @@ def run_login_app():
     # Set page style
     set_page_style()
 
-    # Load credentials and authorize gspread
-    client = load_gspread_credentials()
-
-    # Open the Google Sheet by its name
-    sheet = client.open("ckm").sheet1
+    # Load the storage backend holding the user accounts
+    store = load_storage()
 
     # Display the login form
-    display_login_form(sheet)
+    display_login_form(store)
 
     # Display the footer
     display_footer()
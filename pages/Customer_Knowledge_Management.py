@@ -2,25 +2,241 @@ import time
 import pandas as pd
 import streamlit as st
 import utils
+import cache
+import jobs
+import storage
 import streamlit.components.v1 as components
-from google.cloud import bigquery
-from google.oauth2.service_account import Credentials
 
-# Initialize BigQuery client
-credentials = Credentials.from_service_account_info(
-    st.secrets["gcp_service_account"]
-)
-client = bigquery.Client(credentials=credentials)
 
-# BigQuery configuration
-DATASET_ID = "ckm-apriori.dkriuk"  # Replace with your dataset ID in BigQuery
-TABLE_ID = f"{DATASET_ID}.dkriuk-2023"
+# Storage backend (BigQuery or local files, see storage.STORAGE_BACKEND), built once per process
+@st.cache_resource
+def get_store():
+    if storage.STORAGE_BACKEND == "bigquery":
+        return storage.get_storage(credentials_info=st.secrets["gcp_service_account"])
+    return storage.get_storage()
+
+
+# File list and file contents are cached so Streamlit reruns do not re-query BigQuery
+@st.cache_data(ttl=600, show_spinner=False)
+def get_uploaded_files():
+    return get_store().list_uploaded_files()
+
+
+# cache_resource membagi satu salinan data file ke semua sesi (cache_data menyalin per pemanggilan)
+@st.cache_resource(ttl=600, show_spinner=False)
+def get_file_transactions(file_name, start_time=None, end_time=None):
+    return get_store().load_transactions(file_name, start_time=start_time, end_time=end_time)
+
+
+def mine_incrementally(preprocessed_df, source_key, dataset_floor, progress):
+    """
+    Mining native inkremental per sumber data (nama file/unggahan): hanya order setelah mining terakhir yang di-mining.
+
+    State (hitungan harian itemset) dan setiap blok order ter-bit-pack disimpan terpisah di cache disk, sehingga pembaruan
+    hanya menulis blok order baru; blok lama hanya dibaca bila ada itemset baru yang perlu dihitung di riwayat.
+    """
+    state_key = cache.make_key('incremental_mining', source_key, dataset_floor)
+    state = cache.load(state_key)
+    # Order lama/baru diambil dari baris yang benar-benar masuk keranjang (item kosong tidak dihitung)
+    rows = utils.basket_rows(preprocessed_df)
+
+    def load_block(key):
+        block = cache.load(key)
+        if block is None:
+            raise FileNotFoundError(key)
+        return block
+
+    def store_block(block):
+        block_key = cache.make_key(state_key, 'block', time.time_ns())
+        cache.store(block_key, block)
+        state['blocks'].append(block_key)
+
+    if state is not None:
+        history = rows & (preprocessed_df['orderTime'] <= state['last_order_time']).to_numpy()
+        history_days = preprocessed_df[history].groupby('orderId')['orderTime'].min().dt.to_period('D').value_counts().sort_index()
+        new_df = preprocessed_df[rows & ~history]
+        new_basket = utils.create_basket_sets(new_df)
+        # State hanya dipakai bila order lama di data ini persis riwayatnya (jumlah order per hari dan item sama)
+        if (history_days.index.equals(state['periods']) and (history_days.to_numpy() == state['orders']).all()
+                and state['items'].isin(preprocessed_df['itemName'][history].unique()).all()
+                and not new_basket.index.isin(preprocessed_df['orderId'][history]).any()):
+            if len(new_basket):
+                progress(stage="mining", level=1, candidates=new_basket.shape[1], itemsets=len(state['itemsets']))
+                try:
+                    _, block = utils.update_incremental_mining(state, new_df, new_basket,
+                                                               lambda: [load_block(key) for key in state['blocks']])
+                except FileNotFoundError:
+                    # Blok riwayat sudah terhapus dari cache disk; mining ulang dari awal
+                    state = None
+                else:
+                    store_block(block)
+                    cache.store(state_key, state)
+        else:
+            state = None
+
+    if state is None:
+        basket_sets = utils.create_basket_sets(preprocessed_df)
+        progress(stage="mining", level=1, candidates=basket_sets.shape[1], itemsets=0)
+        state, block = utils.init_incremental_mining(preprocessed_df[rows], basket_sets, support=dataset_floor,
+                                                     n_jobs=utils.MINING_JOBS)
+        state['blocks'] = []
+        store_block(block)
+        cache.store(state_key, state)
+
+    progress(stage="done", itemsets=len(state['itemsets']))
+    return state
+
+
+def mine_dataset(preprocessed_df, item_dictionary, source_key, engine, dataset_floor, progress):
+    """Hitungan harian itemset seluruh dataset pada support dataset_floor; rentang tanggal dijawab dengan menjumlahkannya."""
+    if engine == "native":
+        # Data harian yang bertambah: hanya order baru yang di-mining. Itemset state dilabeli nama item,
+        # karena ID item bisa bergeser saat dataset bertambah item baru
+        bucket_counts = utils.incremental_bucket_counts(mine_incrementally(preprocessed_df, source_key, dataset_floor, progress))
+        return {**bucket_counts, 'itemsets': utils.encode_itemsets(bucket_counts['itemsets'], item_dictionary)}
+
+    basket_sets = utils.create_basket_sets(preprocessed_df, item_dictionary)
+    frequent_items = utils.find_frequent_itemsets(basket_sets, support=dataset_floor, engine=engine, progress=progress)
+    progress(stage="buckets")
+    return utils.bucket_itemset_counts(preprocessed_df, basket_sets, frequent_items)
+
+
+def run_market_basket(filtered_df, preprocessed_df, item_dictionary, dataset_key, source_key, data_key, start_date, end_date,
+                      mining_floor, dataset_floor, min_support, min_confidence, engine, itemset_kind, exact_range, progress):
+    """Mining untuk job background; tidak menyentuh st.session_state karena berjalan di thread lain."""
+    if exact_range:
+        def mine_itemsets():
+            # Kolom keranjang, itemset dan aturan memakai ID item; nama hanya didekode saat ditampilkan
+            basket_sets = utils.create_basket_sets(filtered_df, item_dictionary)
+            frequent_items = utils.find_frequent_itemsets(basket_sets, support=mining_floor, engine=engine, progress=progress)
+            return {'basket_sets': basket_sets, 'frequent_items': frequent_items}
+
+        # Itemset rentang ini di-mining sekali pada support terendah dan disimpan di disk; preset lain cukup memfilter hasilnya
+        progress(stage="basket")
+        mined = cache.cached(cache.make_key('frequent_items', data_key, engine, mining_floor), mine_itemsets)
+        frequent_items = mined['frequent_items']
+        frequent_items_key = cache.make_key(data_key, engine)
+        summary = {
+            'orders': mined['basket_sets'].shape[0],
+            'items': mined['basket_sets'].shape[1],
+            'basket_memory': utils.basket_memory_usage(mined['basket_sets'])
+        }
+
+        # Hitungan itemset per hari untuk tren aturan, dari itemset yang baru di-mining (tanpa mining ulang)
+        progress(stage="buckets")
+        bucket_counts_key = cache.make_key('bucket_counts', data_key, engine, mining_floor)
+        bucket_counts = cache.cached(
+            bucket_counts_key,
+            lambda: utils.bucket_itemset_counts(filtered_df, mined['basket_sets'], frequent_items)
+        )
+    else:
+        # Hitungan harian seluruh dataset dibuat sekali per dataset dan mesin; setiap rentang tanggal cukup menjumlahkannya
+        progress(stage="basket")
+        dataset_counts_key = cache.make_key('dataset_bucket_counts', dataset_key, engine, dataset_floor)
+        dataset_counts = cache.cached(
+            dataset_counts_key,
+            lambda: mine_dataset(preprocessed_df, item_dictionary, source_key, engine, dataset_floor, progress)
+        )
+        frequent_items = utils.window_frequent_itemsets(dataset_counts, start_date, end_date, support=mining_floor)
+        frequent_items_key = cache.make_key(dataset_counts_key, start_date, end_date)
+        summary = {
+            'orders': frequent_items.attrs['n_orders'],
+            'items': filtered_df['itemId'][utils.basket_rows(filtered_df, item_dictionary)].nunique(),
+            'basket_memory': None,
+            'exact_support': frequent_items.attrs['exact_support'],
+            'min_support': min_support
+        }
+        bucket_counts_key = frequent_items_key
+        bucket_counts = utils.window_bucket_counts(dataset_counts, start_date, end_date)
+
+    # Aturan disimpan sebagai indeks ringkas (ID item + metrik float32); frame aturan hanya dibuat untuk baris yang ditampilkan
+    progress(stage="rules")
+    rules_key = cache.make_key('rule_index', frequent_items_key, mining_floor, min_support, min_confidence, itemset_kind,
+                               utils.DISPLAY_RULE_METRICS)
+    rule_index = cache.cached(
+        rules_key,
+        lambda: utils.build_rule_index(
+            utils.generate_rules(frequent_items, support=min_support, min_confidence=min_confidence,
+                                 itemsets=itemset_kind, metrics=utils.DISPLAY_RULE_METRICS),
+            item_dictionary
+        )
+    )
+
+    return {
+        'mining_summary': summary,
+        'frequent_items': frequent_items,
+        'frequent_items_key': frequent_items_key,
+        'rules_key': rules_key,
+        'rule_index': rule_index,
+        'bucket_counts': bucket_counts,
+        'bucket_counts_key': bucket_counts_key
+    }
+
+
+def load_preprocessed(preprocessed_key, df_to_preprocess, already_preprocessed):
+    """Baca dataset Parquet hasil preprocessing; preprocessing hanya dijalankan jika dataset belum tersimpan."""
+    if not storage.has_preprocessed(preprocessed_key):
+        preprocessed_df = df_to_preprocess if already_preprocessed else utils.preprocess_data(df_to_preprocess)
+        # ID item disimpan di dataset agar setiap rentang tanggal memakai ID global yang sama
+        item_dictionary = utils.build_item_dictionary(preprocessed_df)
+        preprocessed_df = preprocessed_df.assign(itemId=utils.encode_items(preprocessed_df['itemName'], item_dictionary))
+        storage.save_preprocessed(preprocessed_df, preprocessed_key)
+    return storage.load_preprocessed(preprocessed_key)
+
+
+def filter_by_date(start_date, end_date):
+    """Filter data per rentang tanggal; hanya partisi bulan yang dibutuhkan yang dibaca dari dataset Parquet."""
+    preprocessed_key = st.session_state.preprocessed_key
+    preprocessed_df = st.session_state.preprocessed_df
+
+    def load():
+        if not storage.has_preprocessed(preprocessed_key):
+            # Dataset dihapus karena batas ukuran disk; simpan ulang dari data yang sudah dimuat di sesi ini
+            storage.save_preprocessed(preprocessed_df, preprocessed_key)
+        return storage.load_preprocessed(preprocessed_key, start_date, end_date)
+
+    return cache.shared(cache.make_key('filtered_df', preprocessed_key, start_date, end_date), load)
+
+
+def run_top_k_rules(filtered_df, item_dictionary, data_key, k, min_confidence, progress):
+    """Mining top-k aturan untuk job background; support minimum ditentukan otomatis."""
+    progress(stage="basket")
+    basket_sets = cache.cached(cache.make_key('basket_sets', data_key), lambda: utils.create_basket_sets(filtered_df, item_dictionary))
+
+    rules_key = cache.make_key('top_k_rule_index', data_key, k, min_confidence)
+    rule_index = cache.cached(
+        rules_key,
+        lambda: utils.build_rule_index(utils.find_top_k_rules(basket_sets, k=k, min_confidence=min_confidence, progress=progress),
+                                       item_dictionary)
+    )
+
+    # Tren top-k hanya perlu itemset dari aturan yang terpilih
+    progress(stage="buckets")
+    bucket_counts_key = cache.make_key('bucket_counts', rules_key)
+    bucket_counts = cache.cached(
+        bucket_counts_key,
+        lambda: utils.bucket_itemset_counts(filtered_df, basket_sets, utils.rule_itemsets(utils.rules_frame(rule_index)))
+    )
+    return {
+        'mining_summary': {
+            'orders': basket_sets.shape[0],
+            'items': basket_sets.shape[1],
+            'basket_memory': utils.basket_memory_usage(basket_sets)
+        },
+        'rules_key': rules_key,
+        'rule_index': rule_index,
+        'bucket_counts': bucket_counts,
+        'bucket_counts_key': bucket_counts_key
+    }
+
 
 # Initialize session state variables
 if 'uploaded_file' not in st.session_state:
     st.session_state.uploaded_file = None
 if 'df' not in st.session_state:
     st.session_state.df = None
+if 'df_preprocessed' not in st.session_state:
+    st.session_state.df_preprocessed = False
 if 'selected_file_name' not in st.session_state:
     st.session_state.selected_file_name = None
 if 'selected_data' not in st.session_state:
@@ -29,18 +245,36 @@ if 'confirm_data' not in st.session_state:
     st.session_state.confirm_data = False 
 if 'preprocessed_df' not in st.session_state:
     st.session_state.preprocessed_df = None
+if 'preprocessed_key' not in st.session_state:
+    st.session_state.preprocessed_key = None
+if 'source_key' not in st.session_state:
+    st.session_state.source_key = None
+if 'item_dictionary' not in st.session_state:
+    st.session_state.item_dictionary = None
 if 'date_range' not in st.session_state:
     st.session_state.date_range = None
 if 'filtered_df' not in st.session_state:
     st.session_state.filtered_df = None
-if 'my_basket_sets' not in st.session_state:
-    st.session_state.my_basket_sets = None
-if 'rules' not in st.session_state:
-    st.session_state.rules = None
-if 'formatted_rules' not in st.session_state:
-    st.session_state.formatted_rules = None
+if 'mining_summary' not in st.session_state:
+    st.session_state.mining_summary = None
+if 'frequent_items' not in st.session_state:
+    st.session_state.frequent_items = None
+if 'frequent_items_key' not in st.session_state:
+    st.session_state.frequent_items_key = None
+if 'rules_key' not in st.session_state:
+    st.session_state.rules_key = None
+if 'bucket_counts' not in st.session_state:
+    st.session_state.bucket_counts = None
+if 'bucket_counts_key' not in st.session_state:
+    st.session_state.bucket_counts_key = None
+if 'rule_index' not in st.session_state:
+    st.session_state.rule_index = None
 if 'selected_combination' not in st.session_state:
     st.session_state.selected_combination = "Pilihan seimbang. Support: 0.015, Confidence: 0.25"
+if 'mining_job_id' not in st.session_state:
+    st.session_state.mining_job_id = None
+if 'mining_engine' not in st.session_state:
+    st.session_state.mining_engine = "native"
 if 'sort_by' not in st.session_state:
     st.session_state.sort_by = "Confidence"
 if "logged_in" not in st.session_state:
@@ -64,7 +298,10 @@ navbar_option = st.sidebar.radio(
     ["Mengunggah Data", "Preprocessing Data", "Analisis Data", "Analisis Apriori", "Penerapan"]
 )
 
-REQUIRED_COLUMNS = ['orderId', 'categoryName', 'itemName', 'price', 'qty', 'orderTime']
+REQUIRED_COLUMNS = storage.REQUIRED_COLUMNS
+
+# Aturan per halaman tabel hasil Apriori
+RULES_PAGE_SIZE = 100
 
 # Section 1: Mengunggah Data
 if navbar_option == "Mengunggah Data":
@@ -72,16 +309,16 @@ if navbar_option == "Mengunggah Data":
         # File uploader for CSV
         uploaded_file = st.file_uploader("Pilih file CSV", type=["csv"], help="Pilih file CSV yang ingin diunggah.")
         
-        if uploaded_file is not None:
-            # Convert the uploaded CSV file into a Pandas DataFrame
-            df = pd.read_csv(uploaded_file)
-            
-            if 'orderTime' in df.columns:
-                df['orderTime'] = pd.to_datetime(df['orderTime'], errors='coerce')
+        missing_upload_columns = utils.missing_csv_columns(uploaded_file, REQUIRED_COLUMNS) if uploaded_file is not None else []
+        if missing_upload_columns:
+            st.error(f"Kolom berikut tidak ada di data yang diunggah: {', '.join(missing_upload_columns)}")
+        elif uploaded_file is not None:
+            # Read the uploaded CSV in chunks; each chunk is cleaned right away so memory stays bounded
+            df = utils.read_csv_in_chunks(uploaded_file)
             
-            df['fileName'] = uploaded_file.name
             st.session_state.uploaded_file = uploaded_file
             st.session_state.df = df
+            st.session_state.df_preprocessed = True
             
             st.markdown(f"#### Data yang diunggah dari file: **{uploaded_file.name}**")
             tab1, tab2 = st.columns(2, gap='medium')
@@ -156,8 +393,7 @@ if navbar_option == "Mengunggah Data":
 
         # Fetch available datasets from BigQuery based on fileName
         st.markdown("#### Pilih File yang Sudah Diunggah Sebelumnya:")
-        query = f"SELECT DISTINCT fileName FROM `{TABLE_ID}`"
-        df_previous_uploads = client.query(query).to_dataframe()
+        df_previous_uploads = get_uploaded_files()
 
         if df_previous_uploads['fileName'].unique().tolist() and st.session_state.selected_file_name is not None and st.session_state.selected_file_name != 'Pilih file sebelumnya':  
             selected_file_name = st.selectbox(
@@ -176,8 +412,14 @@ if navbar_option == "Mengunggah Data":
 
 
         if st.session_state.selected_file_name != 'Pilih file sebelumnya': 
-            query = f"SELECT * FROM `{TABLE_ID}` WHERE fileName = '{st.session_state.selected_file_name}'"
-            selected_data = client.query(query).to_dataframe()
+            # Rentang tanggal opsional; filternya dijalankan di BigQuery sehingga hanya baris dalam rentang yang diunduh
+            load_range = st.date_input("Rentang tanggal yang dimuat (opsional)", value=[],
+                                       help="Kosongkan untuk memuat semua transaksi dari file ini.")
+            load_start, load_end = None, None
+            if len(load_range) > 0:
+                load_start = pd.to_datetime(load_range[0])
+                load_end = pd.to_datetime(load_range[-1]) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+            selected_data = get_file_transactions(st.session_state.selected_file_name, load_start, load_end)
 
             if selected_data is not None:
                 st.markdown(f"#### Data dari file: **{st.session_state.selected_file_name}**")
@@ -336,8 +578,25 @@ elif navbar_option == "Preprocessing Data":
                             </ul>
                             """, unsafe_allow_html=True)
 
-                    preprocessed_df = utils.preprocess_data(df_to_preprocess)
+                    preprocessed_key = cache.make_key('preprocessed_df', utils.dataframe_fingerprint(df_to_preprocess))
+                    # Uploaded CSV was already cleaned chunk by chunk during ingestion
+                    already_preprocessed = st.session_state.df is not None and st.session_state.df_preprocessed
+                    preprocessed_df = cache.shared(
+                        preprocessed_key,
+                        lambda: load_preprocessed(preprocessed_key, df_to_preprocess, already_preprocessed)
+                    )
                     st.session_state.preprocessed_df = preprocessed_df
+                    st.session_state.preprocessed_key = preprocessed_key
+                    # Identitas sumber yang tetap saat data bertambah (unggahan ulang atau baris BigQuery baru), untuk mining inkremental
+                    if st.session_state.df is not None:
+                        st.session_state.source_key = cache.make_key('upload', st.session_state.uploaded_file.name)
+                    else:
+                        st.session_state.source_key = cache.make_key('file', st.session_state.selected_file_name)
+                    # Kamus item (ID <-> nama, kategori) dibaca dari pasangan itemId/itemName yang tersimpan di dataset
+                    st.session_state.item_dictionary = cache.shared(
+                        cache.make_key('item_dictionary', preprocessed_key),
+                        lambda: utils.build_item_dictionary(preprocessed_df)
+                    )
 
                     st.markdown(f"#### Setelah preprocessing data {st.session_state.selected_file_name} siap digunakan untuk analisis")
                     tab1, tab2 = st.columns(2, gap='medium')
@@ -434,7 +693,7 @@ elif navbar_option == "Preprocessing Data":
                         end_date = start_date + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
 
                     # Filter the dataframe based on the selected date range
-                    filtered_df = preprocessed_df[(preprocessed_df['orderTime'] >= start_date) & (preprocessed_df['orderTime'] <= end_date)]
+                    filtered_df = filter_by_date(start_date, end_date)
                     st.session_state.filtered_df = filtered_df
 
                     st.markdown(f"#### Setelah difilter {st.session_state.selected_file_name} siap digunakan untuk analisis")
@@ -549,7 +808,7 @@ elif navbar_option == "Analisis Data":
                 end_date = start_date + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
 
             # Filter the dataframe based on the selected date range in Analysis Data
-            filtered_df = preprocessed_df[(preprocessed_df['orderTime'] >= start_date) & (preprocessed_df['orderTime'] <= end_date)]
+            filtered_df = filter_by_date(start_date, end_date)
             st.session_state.filtered_df = filtered_df
 
             st.sidebar.markdown("#### Analysis Data Filters")
@@ -563,37 +822,50 @@ elif navbar_option == "Analisis Data":
             time_period_map = {"D (Daily)": "D", "W (Weekly)": "W", "M (Monthly)": "M", "Y (Yearly)": "Y"}
             selected_time_period = time_period_map[time_period]
 
-            fig1 = utils.plot_total_transactions(st.session_state.filtered_df, time_period=selected_time_period)
+            # Agregasi dashboard dihitung sekali per data dan rentang tanggal; tiap grafik disimpan terpisah
+            # sehingga mengganti periode hanya membangun ulang grafik total transaksi
+            dashboard_key = cache.make_key('dashboard', st.session_state.preprocessed_key, start_date, end_date)
+            dashboard = cache.shared(dashboard_key, lambda: utils.dashboard_aggregates(filtered_df))
+
+            def dashboard_figure(plot_name, **options):
+                def build():
+                    if plot_name in ('plot_top_items', 'plot_least_sold_items'):
+                        return getattr(utils, plot_name)(None, item_counts=dashboard['item_counts'], **options)
+                    return getattr(utils, plot_name)(dashboard['orders'], **options)
+
+                return cache.shared(cache.make_key('figure', dashboard_key, plot_name, sorted(options.items())), build)
+
+            fig1 = dashboard_figure('plot_total_transactions', time_period=selected_time_period)
             st.plotly_chart(fig1)
 
             tab1, tab2 = st.columns(2, gap='medium')
 
             with tab1:
-                fig1 = utils.plot_monthly_total_transaction(st.session_state.filtered_df)
+                fig1 = dashboard_figure('plot_monthly_total_transaction')
                 st.plotly_chart(fig1)
 
             with tab2:
-                fig2 = utils.plot_weekly_total_transaction(st.session_state.filtered_df)
+                fig2 = dashboard_figure('plot_weekly_total_transaction')
                 st.plotly_chart(fig2)
 
             tab1, tab2 = st.columns(2, gap='medium')
 
             with tab1:
-                fig1 = utils.plot_daily_total_transaction(st.session_state.filtered_df)
+                fig1 = dashboard_figure('plot_daily_total_transaction')
                 st.plotly_chart(fig1)
 
             with tab2:
-                fig2 = utils.plot_hourly_total_transaction(st.session_state.filtered_df)
+                fig2 = dashboard_figure('plot_hourly_total_transaction')
                 st.plotly_chart(fig2)
 
             tab1, tab2 = st.columns(2, gap='medium')
 
             with tab1:
-                fig1 = utils.plot_top_items(st.session_state.filtered_df)
+                fig1 = dashboard_figure('plot_top_items')
                 st.plotly_chart(fig1)
 
             with tab2:
-                fig2 = utils.plot_least_sold_items(st.session_state.filtered_df)
+                fig2 = dashboard_figure('plot_least_sold_items')
                 st.plotly_chart(fig2)
         else:
             st.warning("Silakan unggah dan konfirmasi data terlebih dahulu di bagian 'Mengunggah Data'.")
@@ -635,7 +907,7 @@ elif navbar_option == "Analisis Apriori":
                 end_date = start_date + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
 
             # Filter the dataframe based on the selected date range in Analysis Data
-            filtered_df = preprocessed_df[(preprocessed_df['orderTime'] >= start_date) & (preprocessed_df['orderTime'] <= end_date)]
+            filtered_df = filter_by_date(start_date, end_date)
             st.session_state.filtered_df = filtered_df
         
         st.markdown("#### Jalankan Algoritma Apriori")
@@ -701,6 +973,11 @@ elif navbar_option == "Analisis Apriori":
             }
         }
         
+        # Support terendah dari semua preset, dipakai sebagai batas bawah mining
+        mining_floor = min(combination["values"][0] for combination in combinations.values())
+        # Seluruh dataset di-mining pada separuh batas itu, agar rentang tanggal yang lebih pendek tetap mendapat hasil persis
+        dataset_floor = mining_floor / 2
+
         # Dropdown untuk memilih kombinasi pre-configured min_support dan min_confidence
         selected_combination = st.selectbox(
             "Pilih kombinasi yang direkomendasikan",
@@ -724,53 +1001,160 @@ elif navbar_option == "Analisis Apriori":
         # Menampilkan penjelasan untuk kombinasi yang dipilih
         st.markdown(f"**Penjelasan:** {explanation}")
 
-        # Jalankan algoritma Apriori saat tombol diklik
-        if st.session_state.filtered_df is not None and st.button("Jalankan Apriori", type="primary"):
-            my_basket_sets = utils.create_basket_sets(st.session_state.filtered_df)
-            st.session_state.my_basket_sets = my_basket_sets
-
-            rules = utils.calculate_apriori(my_basket_sets, support=min_support, min_confidence=min_confidence)
-            st.session_state.rules = rules
-
-            formatted_rules = utils.display_association_rules(rules)
-            st.session_state.formatted_rules = formatted_rules
-
-            st.toast('Analisis Market Basket telah selesai!', icon='✅')
-            time.sleep(0.001)
-
-            st.markdown(
-                """
-                <style>
-                .stAlert {
-                    position: fixed;
-                    top: 1rem;
-                    right: 1rem;
-                    width: auto;
-                    z-index: 9999;
-                }
-                </style>
-                """,
-                unsafe_allow_html=True
-            )
+        # Mesin mining frequent itemset; semua pilihan menghasilkan aturan yang sama
+        mining_engine = st.selectbox(
+            "Pilih mesin mining",
+            options=list(utils.MINING_ENGINES),
+            index=list(utils.MINING_ENGINES).index(st.session_state.mining_engine),
+            help="Semua mesin menghasilkan aturan yang sama, pilih yang paling cepat untuk data Anda."
+        )
+        st.session_state.mining_engine = mining_engine
+
+        # Mode top-k: cukup tentukan jumlah aturan, support dinaikkan otomatis selama mining
+        mining_mode = st.radio(
+            "Mode mining",
+            options=["Preset support", "Top-k aturan"],
+            horizontal=True,
+            help="Top-k mencari k aturan dengan support tertinggi (confidence minimal sesuai kombinasi) dalam sekali jalan, tanpa menebak minimum support."
+        )
+        if mining_mode == "Top-k aturan":
+            top_k = st.number_input("Jumlah aturan terbaik (k)", min_value=1, max_value=5000, value=50, step=10)
         else:
+            # Itemset closed/maximal hanya menghasilkan aturan yang tidak redundan
+            itemset_kind = st.selectbox(
+                "Jenis itemset untuk aturan",
+                options=list(utils.ITEMSET_KINDS),
+                format_func={"all": "Semua itemset", "closed": "Closed (aturan non-redundan)", "maximal": "Maximal"}.get,
+                help="Closed membuang aturan redundan tanpa kehilangan informasi support/confidence; maximal lebih ringkas lagi."
+            )
+            exact_range = st.checkbox(
+                "Mining ulang data rentang ini",
+                value=False,
+                help="Secara default itemset rentang tanggal dijumlahkan dari hitungan harian seluruh dataset (cepat, tanpa mining ulang). "
+                     "Hasilnya persis selama support minimum tidak lebih kecil dari batas yang ditampilkan di hasil; "
+                     "centang untuk me-mining ulang data rentang ini jika batas itu terlewati."
+            )
+
+        # Jalankan algoritma Apriori saat tombol diklik; mining berjalan di background
+        if st.session_state.filtered_df is not None and st.button("Jalankan Apriori", type="primary"):
+            data_key = cache.make_key(utils.dataframe_fingerprint(st.session_state.filtered_df), start_date, end_date)
+            # Pengguna lain dengan data dan parameter yang sama memakai job yang sama
+            if mining_mode == "Top-k aturan":
+                job = jobs.submit(
+                    cache.make_key('mining_top_k', data_key, top_k, min_confidence),
+                    run_top_k_rules, st.session_state.filtered_df, st.session_state.item_dictionary, data_key, top_k, min_confidence
+                )
+            else:
+                job = jobs.submit(
+                    cache.make_key('mining', st.session_state.preprocessed_key, data_key, mining_engine, mining_floor, min_support,
+                                   min_confidence, itemset_kind, exact_range),
+                    run_market_basket, st.session_state.filtered_df, st.session_state.preprocessed_df, st.session_state.item_dictionary,
+                    st.session_state.preprocessed_key, st.session_state.source_key, data_key, start_date, end_date, mining_floor,
+                    dataset_floor, min_support, min_confidence, mining_engine, itemset_kind, exact_range
+                )
+            st.session_state.mining_job_id = job.job_id
+        elif st.session_state.filtered_df is None:
             st.warning("Silakan unggah dan konfirmasi data terlebih dahulu di bagian 'Mengunggah Data'.")
 
+        if st.session_state.mining_job_id is not None:
+            job = jobs.get(st.session_state.mining_job_id)
+            if job is None:
+                st.session_state.mining_job_id = None
+            elif not job.done:
+                progress = job.snapshot()
+                if 'min_support' in progress:
+                    st.info(
+                        f"Mining top-k sedang berjalan... Itemset diperiksa: {progress.get('itemsets', '-')}, "
+                        f"aturan: {progress.get('rules', '-')}, support minimum saat ini: {progress['min_support']:.4f}"
+                    )
+                else:
+                    st.info(
+                        f"Mining sedang berjalan... Level itemset: {progress.get('level', '-')}, "
+                        f"kandidat: {progress.get('candidates', '-')}, itemset frequent: {progress.get('itemsets', '-')}"
+                    )
+                time.sleep(1)
+                st.rerun()
+            elif job.status == "failed":
+                st.session_state.mining_job_id = None
+                st.error(f"Mining gagal: {job.error}")
+            else:
+                st.session_state.mining_job_id = None
+                for key, value in job.result.items():
+                    st.session_state[key] = value
+
+                st.toast('Analisis Market Basket telah selesai!', icon='✅')
+                time.sleep(0.001)
+
+                st.markdown(
+                    """
+                    <style>
+                    .stAlert {
+                        position: fixed;
+                        top: 1rem;
+                        right: 1rem;
+                        width: auto;
+                        z-index: 9999;
+                    }
+                    </style>
+                    """,
+                    unsafe_allow_html=True
+                )
+
         # Tampilkan aturan asosiasi jika tersedia
-        if st.session_state.formatted_rules is not None:
+        if st.session_state.rule_index is not None:
+            rule_index = st.session_state.rule_index
+            n_rules = len(rule_index['antecedent_offsets']) - 1
+            summary = st.session_state.mining_summary
             st.markdown(f"""
             #### Hasil Apriori
-            - **Jumlah Transaksi yang Dianalisis**: `{st.session_state.my_basket_sets.shape[0]}`
-            - **Jumlah Item yang Dipertimbangkan**: `{st.session_state.my_basket_sets.shape[1]}`
-            - **Jumlah Aturan Asosiasi yang Dihasilkan**: `{len(st.session_state.rules)}`
+            - **Jumlah Transaksi yang Dianalisis**: `{summary['orders']}`
+            - **Jumlah Item yang Dipertimbangkan**: `{summary['items']}`
+            - **Jumlah Aturan Asosiasi yang Dihasilkan**: `{n_rules}`
             """)
+            basket_memory = summary['basket_memory']
+            if basket_memory is not None:
+                st.markdown(f"- **Memori Matriks Keranjang**: `{basket_memory['bytes'] / 1024 ** 2:.2f} MB` (sebelumnya `{basket_memory['dense_int64_bytes'] / 1024 ** 2:.2f} MB` dengan pivot int64)")
+            if summary['orders'] == 0:
+                st.warning("Tidak ada transaksi pada rentang tanggal ini, sehingga tidak ada aturan yang dihasilkan.")
+            elif 'exact_support' in summary:
+                # Itemset yang jarang di seluruh dataset tidak dilacak, sehingga hasil rentang hanya persis di atas batas ini
+                if summary['exact_support'] <= summary['min_support']:
+                    st.caption(
+                        f"Itemset rentang ini dijumlahkan dari hitungan harian seluruh dataset dan persis untuk support "
+                        f"≥ `{summary['exact_support']:.4f}` (support minimum yang dipakai: `{summary['min_support']:.3f}`)."
+                    )
+                else:
+                    st.warning(
+                        f"Hasil ini perkiraan: itemset rentang ini dijumlahkan dari hitungan harian seluruh dataset, yang hanya persis "
+                        f"untuk support ≥ {summary['exact_support']:.4f} (di atas support minimum {summary['min_support']:.3f}). "
+                        f"Itemset yang hanya sering muncul di rentang pendek ini bisa terlewat; centang "
+                        f"'Mining ulang data rentang ini' untuk hasil persis."
+                    )
+            if 'min_support' in rule_index['attrs']:
+                st.markdown(f"- **Support Minimum yang Dicapai (Top-k)**: `{rule_index['attrs']['min_support']:.4f}`")
 
+            # Hanya baris pada halaman yang dipilih yang dibuat ulang dan diformat menjadi teks
             st.write("Tabel Hasil Apriori:")
-            st.dataframe(st.session_state.formatted_rules)
+            n_pages = max(1, -(-n_rules // RULES_PAGE_SIZE))
+            rules_page = st.number_input("Halaman tabel aturan", min_value=1, max_value=n_pages, value=1, step=1,
+                                         key=f"rules_page_{st.session_state.rules_key}")
+            first_rule = (rules_page - 1) * RULES_PAGE_SIZE
+            shown_rules = utils.rules_frame(rule_index, range(first_rule, min(first_rule + RULES_PAGE_SIZE, n_rules)))
+            shown_rules.index = range(first_rule, first_rule + len(shown_rules))
+            st.dataframe(utils.display_association_rules(shown_rules, st.session_state.item_dictionary))
+            st.caption(f"Menampilkan aturan {first_rule + 1 if n_rules else 0}-{first_rule + len(shown_rules)} dari {n_rules}")
 
             tab1, tab2 = st.columns(2, gap='medium')
             with tab1:
                 st.write("Visualisasi Hasil Apriori dengan Graph:")
-                html_content = utils.generate_pyvis_graph(st.session_state.rules)
+                # HTML graf disimpan per himpunan aturan sehingga rerun tidak membangun ulang graf
+                html_content = cache.shared(
+                    cache.make_key('pyvis_graph', st.session_state.rules_key),
+                    lambda: utils.generate_pyvis_graph(
+                        utils.top_rules(rule_index, utils.GRAPH_MAX_EDGES, ['lift', 'confidence']),
+                        item_dictionary=st.session_state.item_dictionary
+                    )
+                )
                 components.html(html_content, height=650)
 
             with tab2:
@@ -791,9 +1175,32 @@ elif navbar_option == "Analisis Apriori":
                     min_value=5, max_value=100, value=10, 
                     help="Atur jumlah aturan asosiasi teratas yang akan ditampilkan."
                 )
-                bar_chart_fig = utils.plot_top_association_rules(st.session_state.rules, metric=metric, top_n=top_n)
+                bar_chart_fig = utils.plot_top_association_rules(
+                    utils.top_rules(rule_index, top_n, metric), metric=metric, top_n=top_n,
+                    item_dictionary=st.session_state.item_dictionary
+                )
                 st.plotly_chart(bar_chart_fig)
 
+            # Tren aturan per periode dari hitungan itemset per bucket waktu (tanpa mining ulang per rentang)
+            st.write("Tren Aturan Asosiasi per Periode:")
+            trend_period = st.sidebar.selectbox(
+                "Periode Tren Aturan",
+                options=["W (Weekly)", "M (Monthly)", "D (Daily)"],
+                index=0,
+                help="Pilih ukuran periode untuk melihat perubahan aturan dari waktu ke waktu."
+            )
+            trend_freq = trend_period[0]
+            # Hitungan harian dari job mining; minggu/bulan cukup dijumlahkan
+            bucket_counts = st.session_state.bucket_counts
+            if trend_freq != 'D':
+                bucket_counts = cache.shared(
+                    cache.make_key('bucket_counts', st.session_state.bucket_counts_key, trend_freq),
+                    lambda: utils.resample_bucket_counts(st.session_state.bucket_counts, trend_freq)
+                )
+            top_rules = utils.top_rules(rule_index, min(top_n, 10), metric)
+            trends = utils.rule_trends(bucket_counts, top_rules, item_dictionary=st.session_state.item_dictionary)
+            st.plotly_chart(utils.plot_rule_trends(trends, metric=metric))
+
 # Section 5: Penerapan
 elif navbar_option == "Penerapan":
     st.sidebar.markdown("#### Sort dan Filter")
@@ -817,14 +1224,13 @@ elif navbar_option == "Penerapan":
     )
 
     with st.expander("Rekomendasi Produk", expanded=True):
-        if st.session_state.rules is not None:
+        if st.session_state.rule_index is not None:
             st.markdown("#### Pilih Produk untuk Rekomendasi Produk")
 
-            rules_sorted = st.session_state.formatted_rules.sort_values(by=st.session_state.sort_column, ascending=False)
-
-            antecedents_products = rules_sorted['antecedents'].apply(
-                lambda x: [item.strip() for item in x.split(',')]
-            ).explode().unique().tolist()
+            # Produk diurutkan menurut aturan terbaiknya, langsung dari ID item di indeks aturan
+            antecedents_products = utils.rule_item_options(
+                st.session_state.rule_index, side='antecedents', sort_by=st.session_state.sort_column
+            )
 
             # Pilih produk dari 'antecedents' yang akan digunakan untuk rekomendasi
             product_to_recommend = st.selectbox(
@@ -839,9 +1245,10 @@ elif navbar_option == "Penerapan":
                 if product_to_recommend:
                     # Dapatkan rekomendasi produk
                     product_recommendations = utils.product_recommendation(
-                        rules=st.session_state.formatted_rules, 
+                        rules=None, 
                         item=product_to_recommend, 
-                        sort_by=st.session_state.sort_column
+                        sort_by=st.session_state.sort_column,
+                        rule_index=st.session_state.rule_index
                     )
                     
                     if product_recommendations:
@@ -882,16 +1289,13 @@ elif navbar_option == "Penerapan":
 
     
     with st.expander("Rekomendasi Promo", expanded=True):
-        if st.session_state.rules is not None:
+        if st.session_state.rule_index is not None:
             st.markdown("#### Pilih Produk untuk Rekomendasi Promo")
 
-            rules_sorted = st.session_state.formatted_rules.sort_values(by=st.session_state.sort_column, ascending=False)
-
-            # Ambil produk dari antecedents dan consequents yang sudah disortir
-            product_list = pd.concat([
-                rules_sorted['antecedents'].apply(lambda x: [item.strip() for item in x.split(',')]).explode(),
-                rules_sorted['consequents'].apply(lambda x: [item.strip() for item in x.split(',')]).explode()
-            ]).unique().tolist()
+            # Ambil produk dari antecedents dan consequents, diurutkan menurut aturan terbaiknya
+            product_list = utils.rule_item_options(
+                st.session_state.rule_index, side='both', sort_by=st.session_state.sort_column
+            )
 
             # Pilih produk dari 'antecedents' yang akan digunakan untuk rekomendasi
             promo_to_recommend = st.selectbox(
@@ -905,7 +1309,7 @@ elif navbar_option == "Penerapan":
             if st.button("Cari Rekomendasi Promo", type="primary"):
                 if promo_to_recommend:
                     # Panggil fungsi untuk mendapatkan rekomendasi promosi
-                    promo_recommendations = utils.promo_recommendation(st.session_state.rules, promo_to_recommend, sort_by=st.session_state.sort_column)
+                    promo_recommendations = utils.promo_recommendation(None, promo_to_recommend, sort_by=st.session_state.sort_column, rule_index=st.session_state.rule_index)
                     st.session_state.promo_recommendations = promo_recommendations
                     
                     if promo_recommendations:
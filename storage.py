@@ -0,0 +1,304 @@
+import os
+import glob
+import time
+import shutil
+import pandas as pd
+
+# BigQuery configuration
+DATASET_ID = "ckm-apriori.dkriuk"  # Replace with your dataset ID in BigQuery
+TABLE_ID = f"{DATASET_ID}.dkriuk-2023"
+
+# Google Sheet holding the user accounts (columns Email, Username, Password)
+USER_SHEET_NAME = "ckm"
+
+REQUIRED_COLUMNS = ['orderId', 'categoryName', 'itemName', 'price', 'qty', 'orderTime']
+
+# Columns read for analysis; cancelReason is needed by preprocess_data
+LOAD_COLUMNS = REQUIRED_COLUMNS + ['cancelReason']
+
+# Service hours kept by preprocess_data (inclusive)
+SERVICE_HOURS = (9, 21)
+
+# BigQuery type of the orderTime column, used for date range parameters
+ORDER_TIME_TYPE = "DATETIME"
+
+# Backend selection: "bigquery" (default) or "local"
+STORAGE_BACKEND = os.environ.get("CKM_STORAGE_BACKEND", "bigquery")
+
+# Folder used by the local backend: transactions/<fileName>.parquet|.csv and users.csv
+LOCAL_DATA_DIR = os.environ.get("CKM_LOCAL_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+# Preprocessed transactions saved as Parquet datasets (<key>/month=YYYY-MM/*.parquet); override with CKM_PREPROCESSED_DIR
+PREPROCESSED_DIR = os.environ.get("CKM_PREPROCESSED_DIR", os.path.join(LOCAL_DATA_DIR, "preprocessed"))
+
+# Disk budget of the preprocessed datasets; least recently used datasets are removed beyond it.
+# Override with CKM_PREPROCESSED_MAX_BYTES
+PREPROCESSED_MAX_BYTES = int(os.environ.get("CKM_PREPROCESSED_MAX_BYTES", 2 * 1024 ** 3))
+
+# Columns stored dictionary-encoded in the preprocessed dataset
+DICTIONARY_COLUMNS = ['categoryName', 'itemName']
+
+GOOGLE_SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+
+
+class BigQueryStorage:
+    """Transactions in BigQuery and user accounts in a Google Sheet."""
+
+    def __init__(self, credentials_info, table_id=TABLE_ID, user_sheet_name=USER_SHEET_NAME):
+        self.credentials_info = credentials_info
+        self.table_id = table_id
+        self.user_sheet_name = user_sheet_name
+        self._client = None
+        self._sheet = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google.cloud import bigquery
+            from google.oauth2.service_account import Credentials
+
+            credentials = Credentials.from_service_account_info(self.credentials_info)
+            self._client = bigquery.Client(credentials=credentials)
+        return self._client
+
+    def _to_dataframe(self, query, parameters=()):
+        """Run a parameterized query and download the result through the Storage Read API (Arrow)."""
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(query_parameters=list(parameters))
+        return self.client.query(query, job_config=job_config).to_dataframe(create_bqstorage_client=True)
+
+    def list_uploaded_files(self):
+        # Only the fileName column is scanned (and billed)
+        query = f"""
+            SELECT DISTINCT fileName
+            FROM `{self.table_id}`
+            ORDER BY fileName
+        """
+        return self._to_dataframe(query)
+
+    def load_transactions(self, file_name, start_time=None, end_time=None, service_hours=SERVICE_HOURS):
+        from google.cloud import bigquery
+
+        conditions = ["fileName = @file_name", "cancelReason IS NULL"]
+        parameters = [bigquery.ScalarQueryParameter("file_name", "STRING", file_name)]
+
+        if start_time is not None:
+            conditions.append("orderTime >= @start_time")
+            parameters.append(bigquery.ScalarQueryParameter("start_time", ORDER_TIME_TYPE, start_time))
+        if end_time is not None:
+            conditions.append("orderTime <= @end_time")
+            parameters.append(bigquery.ScalarQueryParameter("end_time", ORDER_TIME_TYPE, end_time))
+        if service_hours is not None:
+            conditions.append("EXTRACT(HOUR FROM orderTime) BETWEEN @first_hour AND @last_hour")
+            parameters.append(bigquery.ScalarQueryParameter("first_hour", "INT64", service_hours[0]))
+            parameters.append(bigquery.ScalarQueryParameter("last_hour", "INT64", service_hours[1]))
+
+        query = f"""
+            SELECT {', '.join(LOAD_COLUMNS)}
+            FROM `{self.table_id}`
+            WHERE {' AND '.join(conditions)}
+        """
+        return self._to_dataframe(query, parameters)
+
+    def load_users(self):
+        if self._sheet is None:
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            credentials = Credentials.from_service_account_info(self.credentials_info, scopes=GOOGLE_SCOPES)
+            self._sheet = gspread.authorize(credentials).open(self.user_sheet_name).sheet1
+        return self._sheet.get_all_records()
+
+
+class LocalStorage:
+    """Transactions and user accounts read from Parquet/CSV files in a local folder."""
+
+    def __init__(self, data_dir=LOCAL_DATA_DIR):
+        self.data_dir = data_dir
+
+    def _transaction_files(self):
+        pattern = os.path.join(self.data_dir, "transactions", "*")
+        paths = [path for path in glob.glob(pattern) if path.endswith((".parquet", ".csv"))]
+        return {os.path.splitext(os.path.basename(path))[0]: path for path in sorted(paths)}
+
+    def _read(self, path, columns=None):
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path, columns=columns)
+        return pd.read_csv(path, usecols=(lambda column: column in columns) if columns else None)
+
+    def list_uploaded_files(self):
+        return pd.DataFrame({'fileName': list(self._transaction_files())})
+
+    def load_transactions(self, file_name, start_time=None, end_time=None, service_hours=SERVICE_HOURS):
+        df = self._read(self._transaction_files()[file_name], LOAD_COLUMNS)
+        order_time = pd.to_datetime(df['orderTime'])
+
+        mask = df['cancelReason'].isna()
+        if start_time is not None:
+            mask &= order_time >= pd.Timestamp(start_time)
+        if end_time is not None:
+            mask &= order_time <= pd.Timestamp(end_time)
+        if service_hours is not None:
+            mask &= order_time.dt.hour.between(*service_hours)
+        return df[mask].reset_index(drop=True)
+
+    def load_users(self):
+        return pd.read_csv(os.path.join(self.data_dir, "users.csv"), dtype=str).fillna("").to_dict("records")
+
+
+def _dataset_path(dataset_key, dataset_dir=None):
+    return os.path.join(dataset_dir or PREPROCESSED_DIR, dataset_key)
+
+
+def _month_partition(timestamp):
+    return pd.Timestamp(timestamp).strftime("%Y-%m")
+
+
+def has_preprocessed(dataset_key, dataset_dir=None):
+    """
+    Check whether a preprocessed dataset was saved under dataset_key.
+
+    Parameters:
+    - dataset_key: Key of the dataset, e.g. cache.make_key of the raw data fingerprint.
+    - dataset_dir: Parent folder of the datasets (default is PREPROCESSED_DIR).
+
+    Returns:
+    - exists: True when save_preprocessed finished writing the dataset.
+    """
+    return os.path.isdir(_dataset_path(dataset_key, dataset_dir))
+
+
+def save_preprocessed(df, dataset_key, dataset_dir=None):
+    """
+    Save the output of preprocess_data as a Parquet dataset partitioned by month of orderTime.
+
+    itemName and categoryName are written dictionary-encoded. The dataset is written to a
+    temporary folder and renamed, so readers never see a partially written dataset. Least
+    recently loaded datasets beyond PREPROCESSED_MAX_BYTES are removed afterwards.
+
+    Parameters:
+    - df: Preprocessed transactions.
+    - dataset_key: Key of the dataset, e.g. cache.make_key of the raw data fingerprint.
+    - dataset_dir: Parent folder of the datasets (default is PREPROCESSED_DIR).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = _dataset_path(dataset_key, dataset_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    df = df.assign(month=df['orderTime'].dt.strftime("%Y-%m"))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for column in DICTIONARY_COLUMNS:
+        index = table.schema.get_field_index(column)
+        table = table.set_column(index, column, table.column(column).dictionary_encode())
+
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    pq.write_to_dataset(table, tmp_path, partition_cols=['month'], use_dictionary=DICTIONARY_COLUMNS)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process saved the same dataset first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    evict_preprocessed(dataset_dir=dataset_dir, keep=[dataset_key])
+
+
+def _tree_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def evict_preprocessed(max_bytes=None, dataset_dir=None, keep=()):
+    """
+    Remove least recently loaded datasets until the saved datasets fit in max_bytes.
+
+    Parameters:
+    - max_bytes: Size budget in bytes (default is PREPROCESSED_MAX_BYTES).
+    - dataset_dir: Parent folder of the datasets (default is PREPROCESSED_DIR).
+    - keep: Dataset keys never removed, e.g. the dataset just saved.
+    """
+    max_bytes = PREPROCESSED_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        # Temporary folders are datasets still being written
+        entries = [entry for entry in os.scandir(dataset_dir or PREPROCESSED_DIR)
+                   if entry.is_dir() and not entry.name.endswith(".tmp")]
+    except FileNotFoundError:
+        return
+
+    # The folder modification time doubles as the last load time (see load_preprocessed)
+    stats = sorted((entry.stat().st_mtime, _tree_size(entry.path), entry.name, entry.path) for entry in entries)
+    total = sum(size for _, size, _, _ in stats)
+    for _, size, name, path in stats:
+        if total <= max_bytes:
+            break
+        if name in keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def load_preprocessed(dataset_key, start_time=None, end_time=None, dataset_dir=None):
+    """
+    Load a preprocessed dataset saved by save_preprocessed.
+
+    Only the month partitions overlapping [start_time, end_time] are read, memory-mapped.
+    itemName and categoryName come back as categoricals with sorted categories, limited
+    to the names present in the loaded rows.
+
+    Parameters:
+    - dataset_key: Key passed to save_preprocessed.
+    - start_time: Earliest orderTime to keep (inclusive), or None.
+    - end_time: Latest orderTime to keep (inclusive), or None.
+    - dataset_dir: Parent folder of the datasets (default is PREPROCESSED_DIR).
+
+    Returns:
+    - df: Preprocessed transactions in the date range.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    filters = []
+    if start_time is not None:
+        filters += [('month', '>=', _month_partition(start_time)), ('orderTime', '>=', pd.Timestamp(start_time))]
+    if end_time is not None:
+        filters += [('month', '<=', _month_partition(end_time)), ('orderTime', '<=', pd.Timestamp(end_time))]
+
+    path = _dataset_path(dataset_key, dataset_dir)
+    # Mark the dataset as recently used for evict_preprocessed
+    now = time.time()
+    os.utime(path, (now, now))
+    table = pq.read_table(
+        path,
+        filters=filters or None,
+        partitioning=ds.partitioning(pa.schema([('month', pa.string())]), flavor="hive"),
+        memory_map=True
+    )
+    df = table.drop_columns(['month']).to_pandas()
+    for column in DICTIONARY_COLUMNS:
+        names = df[column].cat.remove_unused_categories()
+        df[column] = names.cat.reorder_categories(sorted(names.cat.categories))
+    return df
+
+
+def get_storage(backend=None, credentials_info=None):
+    """
+    Create the configured storage backend.
+
+    Both backends expose list_uploaded_files(), load_transactions(file_name, ...) and
+    load_users(), so pages work the same online and offline.
+
+    Parameters:
+    - backend: "bigquery" or "local" (default is STORAGE_BACKEND, from CKM_STORAGE_BACKEND).
+    - credentials_info: Google service account info, required by the BigQuery backend.
+
+    Returns:
+    - storage: BigQueryStorage or LocalStorage instance.
+    """
+    backend = backend or STORAGE_BACKEND
+    if backend == "bigquery":
+        return BigQueryStorage(credentials_info)
+    if backend == "local":
+        return LocalStorage()
+    raise ValueError(f"Unknown storage backend '{backend}', choose 'bigquery' or 'local'")
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+
+
+def transactions(n_orders, n_items, n_days, seed):
+    rng = np.random.default_rng(seed)
+    # A few popular items so itemsets of several lengths are frequent
+    weights = rng.random(n_items) ** 3 * 0.5
+    basket = rng.random((n_orders, n_items)) < weights
+    order_codes, item_codes = np.nonzero(basket)
+    order_times = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, n_days * 24 * 3600, n_orders)), unit='s')
+    return pd.DataFrame({
+        'orderId': order_codes.astype(np.int64),
+        'itemName': [f"item {code:02d}" for code in item_codes],
+        'orderTime': order_times[order_codes],
+    })
+
+
+def mine(df, support):
+    return utils.find_frequent_itemsets(utils.create_basket_sets(df), support=support, engine="native")
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    df = transactions(3000, 25, 60, seed=3)
+    floor = 0.01
+    basket_sets = utils.create_basket_sets(df)
+    return df, utils.bucket_itemset_counts(df, basket_sets, mine(df, floor))
+
+
+@pytest.mark.parametrize('start, end', [("2024-01-01", "2024-03-01"), ("2024-01-10", "2024-02-09"), ("2024-02-20", "2024-02-21")])
+def test_window_matches_mining_the_range_above_the_exact_support(dataset, start, end):
+    df, bucket_counts = dataset
+    end = pd.Timestamp(end) - pd.Timedelta(seconds=1)
+    in_range = df[(df['orderTime'] >= start) & (df['orderTime'] <= end)]
+    n_orders = in_range['orderId'].nunique()
+
+    exact_support = utils.window_frequent_itemsets(bucket_counts, start, end).attrs['exact_support']
+    for support in (exact_support, exact_support * 1.5):
+        window = utils.window_frequent_itemsets(bucket_counts, start, end, support=support)
+        expected = mine(in_range, support)
+
+        assert window.attrs['n_orders'] == n_orders
+        pd.testing.assert_frame_equal(window, expected)
+
+
+def test_window_below_the_exact_support_only_misses_itemsets(dataset):
+    df, bucket_counts = dataset
+    start, end = "2024-02-20", pd.Timestamp("2024-02-22") - pd.Timedelta(seconds=1)
+    window = utils.window_frequent_itemsets(bucket_counts, start, end, support=0.01)
+    assert window.attrs['exact_support'] > 0.01
+
+    expected = mine(df[(df['orderTime'] >= start) & (df['orderTime'] <= end)], 0.01)
+    found = dict(zip(window['itemsets'], window['support']))
+    assert set(found) < set(expected['itemsets'])
+    assert all(found[itemset] == support for itemset, support in zip(expected['itemsets'], expected['support']) if itemset in found)
+
+
+def test_window_rejects_a_support_below_the_floor(dataset):
+    _, bucket_counts = dataset
+    with pytest.raises(ValueError):
+        utils.window_frequent_itemsets(bucket_counts, support=0.005)
+
+
+def test_empty_window_has_no_itemsets(dataset):
+    _, bucket_counts = dataset
+    window = utils.window_frequent_itemsets(bucket_counts, "2025-01-01", "2025-01-31")
+    assert len(window) == 0 and window.attrs['n_orders'] == 0
+
+
+def test_window_bucket_counts_keeps_the_buckets_of_the_range(dataset):
+    df, bucket_counts = dataset
+    window = utils.window_bucket_counts(bucket_counts, "2024-01-10", "2024-01-20 23:59:59")
+
+    assert list(window['periods'].astype(str)) == [f"2024-01-{day}" for day in range(10, 21)]
+    in_range = df[(df['orderTime'] >= "2024-01-10") & (df['orderTime'] < "2024-01-21")]
+    assert window['orders'].sum() == in_range['orderId'].nunique()
+    assert window['counts'].shape == (11, len(bucket_counts['itemsets']))
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+from tests.test_bucket_counts import transactions
+
+
+def assert_same_bucket_counts(result, expected):
+    assert result['periods'].equals(expected['periods'])
+    np.testing.assert_array_equal(result['orders'], expected['orders'])
+    assert result['itemsets'] == expected['itemsets']
+    np.testing.assert_array_equal(result['counts'], expected['counts'])
+    assert result['min_support'] == expected['min_support']
+
+
+@pytest.mark.parametrize('support', [0.02, 0.05])
+def test_incremental_mining_matches_full_mining(support):
+    df = transactions(1500, 25, 30, seed=1)
+    # Item 24 is only sold from day 20 on
+    df = df[(df['itemName'] != "item 24") | (df['orderTime'] >= "2024-01-21")]
+    # Cut-offs inside a day, so one day is split between init and update
+    cuts = [pd.Timestamp(cut) for cut in ("2024-01-18 12:00", "2024-01-19", "2024-01-19", "2024-01-25 06:00", "2024-02-01")]
+
+    first = df[df['orderTime'] < cuts[0]]
+    state, block = utils.init_incremental_mining(first, utils.create_basket_sets(first), support=support)
+    blocks = [block]
+    for start, stop in zip(cuts, cuts[1:]):
+        new = df[(df['orderTime'] >= start) & (df['orderTime'] < stop)]
+        _, block = utils.update_incremental_mining(state, new, utils.create_basket_sets(new), lambda: blocks)
+        blocks.append(block)
+
+        seen = df[df['orderTime'] < stop]
+        basket_sets = utils.create_basket_sets(seen)
+        expected = utils.find_frequent_itemsets(basket_sets, support=support, engine="native")
+        bucket_counts = utils.incremental_bucket_counts(state)
+        assert_same_bucket_counts(bucket_counts, utils.bucket_itemset_counts(seen, basket_sets, expected))
+        pd.testing.assert_frame_equal(utils.window_frequent_itemsets(bucket_counts), expected)
+
+
+def test_incremental_mining_only_loads_history_to_rescan_new_itemsets():
+    df = transactions(1000, 20, 20, seed=2)
+    old, new = df[df['orderTime'] < "2024-01-15"], df[df['orderTime'] >= "2024-01-15"]
+    state, block = utils.init_incremental_mining(old, utils.create_basket_sets(old), support=0.05)
+
+    def history():
+        raise AssertionError("history loaded without new itemsets")
+
+    # Orders with only already frequent items cannot produce new itemsets
+    single = new[new['itemName'] == state['items'][state['itemsets'][0][0]]]
+    utils.update_incremental_mining(state, single, utils.create_basket_sets(single), history)
+
+
+def test_incremental_mining_reports_promoted_and_demoted_itemsets():
+    times = pd.date_range("2024-01-01", periods=8, freq="h")
+    old = pd.DataFrame({'orderId': [1, 2, 3], 'itemName': ['a', 'a', 'b'], 'orderTime': times[[0, 1, 2]]})
+    # Order 4 has no basket item; only orders with items count
+    old = pd.concat([old, pd.DataFrame({'orderId': [4], 'itemName': [None], 'orderTime': times[[3]]})])
+    new = pd.DataFrame({'orderId': [5, 6, 6, 7, 8], 'itemName': ['b', 'b', 'c', 'b', 'b'], 'orderTime': times[[4, 5, 5, 6, 7]]})
+    state, block = utils.init_incremental_mining(old, utils.create_basket_sets(old), support=0.5)
+
+    changes, new_block = utils.update_incremental_mining(state, new, utils.create_basket_sets(new), lambda: [block])
+
+    status = dict(zip(changes['itemsets'], changes['status']))
+    assert status == {frozenset({'b'}): "promoted", frozenset({'a'}): "demoted"}
+    assert list(state['orders']) == [7]
+    # The new block only holds the new orders, with a row for every item seen so far
+    assert new_block['packed'].shape == (3, 1)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mlxtend.frequent_patterns import apriori
+
+import utils
+
+
+def random_baskets(n_orders, n_items, seed):
+    rng = np.random.default_rng(seed)
+    # Skewed item popularity so itemsets of several lengths are frequent
+    weights = rng.random(n_items) ** 2 * 0.4
+    basket = rng.random((n_orders, n_items)) < weights
+    return pd.DataFrame(basket, columns=[f"item {i:02d}" for i in range(n_items)])
+
+
+def as_supports(frequent_items):
+    return dict(zip(frequent_items['itemsets'], frequent_items['support']))
+
+
+@pytest.mark.parametrize('engine', utils.MINING_ENGINES)
+@pytest.mark.parametrize('support', [0.01, 0.05])
+def test_engines_match_mlxtend_apriori(engine, support):
+    baskets = random_baskets(800, 25, seed=3)
+    expected = as_supports(apriori(baskets, min_support=support, use_colnames=True))
+
+    result = utils.find_frequent_itemsets(baskets, support=support, engine=engine)
+
+    assert as_supports(result).keys() == expected.keys()
+    for itemset, value in as_supports(result).items():
+        assert value == pytest.approx(expected[itemset])
+    assert result.attrs['min_support'] == support
+
+
+def test_engines_return_the_same_frame():
+    baskets = random_baskets(500, 20, seed=4)
+    frames = [utils.find_frequent_itemsets(baskets, support=0.02, engine=engine) for engine in utils.MINING_ENGINES]
+    for frame in frames[1:]:
+        pd.testing.assert_frame_equal(frame, frames[0])
+
+
+@pytest.mark.parametrize('engine', utils.MINING_ENGINES)
+def test_engines_return_an_empty_frame_without_orders(engine):
+    baskets = random_baskets(0, 5, seed=5)
+
+    result = utils.find_frequent_itemsets(baskets, support=0.02, engine=engine)
+
+    assert result.empty
+    assert list(result.columns) == ['support', 'itemsets']
@@ -0,0 +1,117 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+
+
+def reference_preprocess_data(df):
+    """Row-by-row preprocess_data as it was before vectorization, kept as the behavior reference."""
+    df = df.copy()
+    df['orderTime'] = pd.to_datetime(df['orderTime'], format='%Y-%m-%d %H:%M')
+    df['categoryName'] = df['categoryName'].str.lower()
+    df['itemName'] = df['itemName'].str.lower()
+    df['itemName'] = df['itemName'].str.strip()
+    df['itemName'] = df['itemName'].apply(lambda x: re.sub(r'[^a-zA-Z\s]', '', x))
+    df['itemName'] = df['itemName'].str.replace(r'\s+', ' ', regex=True)
+    invalid_items_mask = df['itemName'].str.match(r'^[^\w]+$')
+    df = df[~invalid_items_mask]
+
+    df['orderId'] = df['orderId'].astype('Int64')
+    df['qty'] = df['qty'].astype('Int64')
+    df['orderTime'] = pd.to_datetime(df['orderTime'])
+    df = df[df['cancelReason'].isna()]
+    df = df.drop(columns=['cancelReason'])
+
+    df['qty'] = df.groupby(['orderId', 'categoryName', 'itemName'])['qty'].transform('sum')
+    df = df.drop_duplicates(subset=['orderId', 'categoryName', 'itemName'])
+
+    df['totalPrice'] = df['price'] * df['qty']
+    df = df[['orderId', 'categoryName', 'itemName', 'price', 'qty', 'totalPrice', 'orderTime']]
+
+    df['hour_in_day'] = df['orderTime'].dt.hour
+    df = df[(df['hour_in_day'] >= 9) & (df['hour_in_day'] <= 21)]
+    df = df.drop(columns=['hour_in_day'])
+
+    return df
+
+
+def assert_same_rows(result, expected):
+    """Frames are equal, counting None and NaN in text columns as the same missing value."""
+    def missing_as_nan(df):
+        text = df.select_dtypes(include=object).columns
+        return df.assign(**{column: df[column].where(df[column].notna(), np.nan) for column in text})
+
+    pd.testing.assert_frame_equal(missing_as_nan(result), missing_as_nan(expected))
+
+
+def transactions(rows):
+    return pd.DataFrame(rows, columns=['orderId', 'categoryName', 'itemName', 'price', 'qty', 'orderTime', 'cancelReason'])
+
+
+EDGE_CASES = {
+    'digit_only_and_blank_names': [
+        (1, 'Food', '123', 10000, 1, '2023-01-01 10:00', None),
+        (1, 'Food', '   ', 10000, 1, '2023-01-01 10:00', None),
+        (1, 'Food', '!!', 10000, 1, '2023-01-01 10:00', None),
+        (2, 'Food', ' Nasi  Goreng-2 ', 20000, 2, '2023-01-01 11:00', None),
+    ],
+    'missing_qty_and_category': [
+        (1, None, 'Es Teh', 5000, 1, '2023-01-02 12:00', None),
+        (1, None, 'es teh', 5000, 2, '2023-01-02 12:00', None),
+        (2, 'Drink', 'Es Jeruk', 6000, None, '2023-01-02 13:00', None),
+        (2, 'Drink', 'Es Jeruk', 6000, None, '2023-01-02 13:00', None),
+        (3, 'Drink', 'Kopi', 8000, None, '2023-01-02 14:00', None),
+        (3, 'Drink', 'Kopi', 8000, 3, '2023-01-02 14:00', None),
+    ],
+    'duplicate_lines': [
+        (1, 'Food', 'Ayam Bakar', 25000, 1, '2023-01-03 12:00', None),
+        (1, 'FOOD', 'ayam  bakar', 25000, 2, '2023-01-03 12:00', None),
+        (1, 'Food', 'Ayam Bakar', 25000, 1, '2023-01-03 12:00', 'Habis'),
+        (2, 'Food', 'Ayam Bakar', 25000, 1, '2023-01-03 12:30', None),
+    ],
+    'out_of_hours_rows': [
+        (1, 'Food', 'Soto', 15000, 1, '2023-01-04 08:59', None),
+        (2, 'Food', 'Soto', 15000, 1, '2023-01-04 09:00', None),
+        (3, 'Food', 'Soto', 15000, 1, '2023-01-04 21:59', None),
+        (4, 'Food', 'Soto', 15000, 1, '2023-01-04 22:00', None),
+    ],
+}
+
+
+@pytest.mark.parametrize('case', sorted(EDGE_CASES))
+def test_preprocess_data_matches_reference(case):
+    df = transactions(EDGE_CASES[case])
+    assert_same_rows(utils.preprocess_data(df.copy()), reference_preprocess_data(df))
+
+
+def test_preprocess_data_matches_reference_on_random_data():
+    rng = np.random.default_rng(0)
+    n = 2000
+    minutes = pd.to_timedelta(rng.integers(0, 30 * 24 * 60, n), unit='min')
+    df = pd.DataFrame({
+        'orderId': rng.integers(1, 300, n),
+        'categoryName': rng.choice(np.array(['Food', 'food', 'Drink', None], dtype=object), n),
+        'itemName': rng.choice(['Nasi Goreng', 'nasi goreng ', 'Es Teh', 'ES  TEH', '123', 'Kopi-2', ' ', 'Soto'], n),
+        'price': rng.integers(1, 30, n) * 1000,
+        'qty': pd.array(np.where(rng.random(n) < 0.05, None, rng.integers(1, 4, n)), dtype='Int64'),
+        'orderTime': (pd.Timestamp('2023-01-01') + minutes).strftime('%Y-%m-%d %H:%M'),
+        'cancelReason': np.where(rng.random(n) < 0.05, 'batal', None),
+    })
+    assert_same_rows(utils.preprocess_data(df.copy()), reference_preprocess_data(df))
+
+
+def test_read_csv_in_chunks_matches_preprocess_data(tmp_path):
+    rows = [row for case in sorted(EDGE_CASES) for row in EDGE_CASES[case]]
+    df = transactions(rows)
+    path = tmp_path / "transactions.csv"
+    df.to_csv(path, index=False)
+
+    expected = utils.preprocess_data(pd.read_csv(path))
+    result = utils.read_csv_in_chunks(path, chunksize=3)
+    pd.testing.assert_frame_equal(
+        result.astype({'categoryName': object, 'itemName': object}).reset_index(drop=True),
+        expected.reset_index(drop=True),
+        check_dtype=False
+    )
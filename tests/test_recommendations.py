@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import utils
+from tests.test_mining_engines import random_baskets
+
+
+def brute_force_recommendations(rule_index, carts, sort_by, top_k):
+    """Scan every rule for every cart with plain set logic."""
+    items = rule_index['items']
+    item_ids = rule_index['item_ids']
+    n_rules = len(rule_index['antecedent_offsets']) - 1
+
+    def side(offsets, ids, rule):
+        return {items[item] for item in ids[offsets[rule]:offsets[rule + 1]]}
+
+    recommendations = []
+    for cart in carts:
+        cart = set(cart)
+        best = {}
+        for rule in range(n_rules):
+            if not side(rule_index['antecedent_offsets'], rule_index['antecedent_ids'], rule) <= cart:
+                continue
+            score = rule_index[sort_by][rule]
+            for product in side(rule_index['consequent_offsets'], rule_index['consequent_ids'], rule) - cart:
+                # Highest score wins, the earliest rule on ties
+                if product not in best or score > rule_index[sort_by][best[product]]:
+                    best[product] = rule
+        ranked = sorted(best, key=lambda product: (-rule_index[sort_by][best[product]], item_ids[product]))[:top_k]
+        recommendations.append([
+            {
+                'product': product,
+                'confidence': float(rule_index['confidence'][best[product]]),
+                'support': float(rule_index['support'][best[product]])
+            }
+            for product in ranked
+        ])
+    return recommendations
+
+
+@pytest.fixture(scope='module')
+def rule_index():
+    frequent_items = utils.find_frequent_itemsets(random_baskets(1500, 20, seed=11), support=0.01, engine="native")
+    return utils.build_rule_index(utils.generate_rules(frequent_items, support=0.01, min_confidence=0.05))
+
+
+@pytest.mark.parametrize('sort_by', ['confidence', 'support'])
+@pytest.mark.parametrize('chunk_size', [None, 8])
+def test_recommend_for_carts_matches_brute_force(rule_index, sort_by, chunk_size):
+    rng = np.random.default_rng(12)
+    names = list(rule_index['items']) + ["item tidak dikenal"]
+    carts = [list(rng.choice(names, size=rng.integers(0, 6), replace=False)) for _ in range(300)]
+    assert (np.diff(rule_index['antecedent_offsets']) > 1).any()
+
+    result = utils.recommend_for_carts(rule_index, carts, sort_by=sort_by, top_k=4, chunk_size=chunk_size)
+
+    assert result == brute_force_recommendations(rule_index, carts, sort_by, top_k=4)
+    assert any(result)
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+from mlxtend.frequent_patterns import association_rules
+
+import utils
+from tests.test_mining_engines import random_baskets
+
+
+def canonical(rules):
+    """Rules in a fixed order (by sides), with the mlxtend metric columns."""
+    key = [(tuple(sorted(a)), tuple(sorted(c))) for a, c in zip(rules['antecedents'], rules['consequents'])]
+    rules = rules.iloc[sorted(range(len(rules)), key=key.__getitem__)]
+    return rules[['antecedents', 'consequents', *utils.RULE_METRICS]].reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def frequent_items():
+    return utils.find_frequent_itemsets(random_baskets(1000, 20, seed=7), support=0.01, engine="native")
+
+
+@pytest.mark.parametrize('min_confidence', [0.0, 0.25, 0.6])
+def test_generate_rules_matches_association_rules_on_lift(frequent_items, min_confidence):
+    expected = association_rules(frequent_items, metric='lift', min_threshold=1)
+    expected = expected[expected['confidence'] >= min_confidence]
+
+    result = utils.generate_rules(frequent_items, support=0.01, min_confidence=min_confidence)
+
+    assert len(result) > 0
+    pd.testing.assert_frame_equal(canonical(result), canonical(expected))
+    assert result['confidence'].is_monotonic_decreasing
+
+
+@pytest.mark.parametrize('min_threshold, min_confidence', [(0.3, 0.25), (0.2, 0.5)])
+def test_generate_rules_matches_association_rules_on_confidence(frequent_items, min_threshold, min_confidence):
+    expected = association_rules(frequent_items, metric='confidence', min_threshold=min_threshold)
+    expected = expected[expected['confidence'] >= min_confidence]
+
+    result = utils.generate_rules(frequent_items, support=0.01, min_confidence=min_confidence,
+                                  metric='confidence', min_threshold=min_threshold)
+
+    assert len(result) > 0
+    pd.testing.assert_frame_equal(canonical(result), canonical(expected))
+
+
+def test_generate_rules_above_the_floor_matches_mining_at_that_support(frequent_items):
+    direct = utils.find_frequent_itemsets(random_baskets(1000, 20, seed=7), support=0.03, engine="native")
+
+    result = utils.generate_rules(frequent_items, support=0.03, min_confidence=0.25)
+
+    pd.testing.assert_frame_equal(canonical(result), canonical(utils.generate_rules(direct, support=0.03, min_confidence=0.25)))
+
+
+def test_generate_rules_computes_only_the_requested_metrics(frequent_items):
+    full = utils.generate_rules(frequent_items, support=0.01, min_confidence=0.25)
+
+    result = utils.generate_rules(frequent_items, support=0.01, min_confidence=0.25, metrics=utils.DISPLAY_RULE_METRICS)
+
+    assert list(result.columns) == ['antecedents', 'consequents', *utils.DISPLAY_RULE_METRICS]
+    pd.testing.assert_frame_equal(result, full[result.columns])
@@ -0,0 +1,54 @@
+import os
+import time
+
+import pandas as pd
+
+import storage
+import utils
+from tests.test_preprocess import EDGE_CASES, transactions
+
+
+def preprocessed():
+    return utils.preprocess_data(transactions([row for case in sorted(EDGE_CASES) for row in EDGE_CASES[case]]))
+
+
+def test_saved_dataset_loads_back_by_date_range(tmp_path):
+    df = preprocessed()
+    storage.save_preprocessed(df, 'dataset', dataset_dir=tmp_path)
+
+    loaded = storage.load_preprocessed('dataset', '2023-01-02', '2023-01-03 23:59:59', dataset_dir=tmp_path)
+
+    expected = df[df['orderTime'].between('2023-01-02', '2023-01-03 23:59:59')]
+    pd.testing.assert_frame_equal(
+        loaded.astype({'categoryName': object, 'itemName': object}).reset_index(drop=True),
+        expected.reset_index(drop=True),
+        check_dtype=False
+    )
+
+
+def test_least_recently_loaded_datasets_are_evicted(tmp_path):
+    df = preprocessed()
+    for key in ['old', 'used', 'new']:
+        storage.save_preprocessed(df, key, dataset_dir=tmp_path)
+        time.sleep(0.01)
+    storage.load_preprocessed('old', dataset_dir=tmp_path)
+    size = max(storage._tree_size(tmp_path / key) for key in ['old', 'used', 'new'])
+
+    storage.evict_preprocessed(max_bytes=2 * size, dataset_dir=tmp_path, keep=['new'])
+
+    assert sorted(os.listdir(tmp_path)) == ['new', 'old']
+    assert storage.has_preprocessed('new', dataset_dir=tmp_path) and not storage.has_preprocessed('used', dataset_dir=tmp_path)
+
+
+def test_item_dictionary_of_a_saved_dataset_follows_the_stored_ids(tmp_path):
+    df = preprocessed()
+    item_dictionary = utils.build_item_dictionary(df)
+    # Ids that do not follow name order must still be decoded as stored
+    item_ids = (utils.encode_items(df['itemName'], item_dictionary) + 1) % len(item_dictionary['items'])
+    storage.save_preprocessed(df.assign(itemId=item_ids), 'dataset', dataset_dir=tmp_path)
+
+    loaded = storage.load_preprocessed('dataset', dataset_dir=tmp_path)
+    loaded_dictionary = utils.build_item_dictionary(loaded)
+
+    assert list(loaded_dictionary['items'][loaded['itemId']]) == list(loaded['itemName'])
+    assert sorted(loaded_dictionary['items']) == sorted(item_dictionary['items'])
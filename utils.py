@@ -1,77 +1,805 @@
+import os
 import re
+import heapq
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack, contextmanager
+from itertools import combinations
+from multiprocessing import shared_memory
+import numpy as np
 import pandas as pd
 import networkx as nx
 import plotly.express as px
 from pyvis.network import Network
-from mlxtend.frequent_patterns import association_rules, apriori
+from mlxtend.frequent_patterns import association_rules, apriori, fpgrowth
 
 
-def preprocess_data(df):
-    df['orderTime'] = pd.to_datetime(df['orderTime'], format='%Y-%m-%d %H:%M')
-    df['categoryName'] = df['categoryName'].str.lower()
-    df['itemName'] = df['itemName'].str.lower()
-    df['itemName'] = df['itemName'].str.strip()
-    df['itemName'] = df['itemName'].apply(lambda x: re.sub(r'[^a-zA-Z\s]', '', x))
-    df['itemName'] = df['itemName'].str.replace(r'\s+', ' ', regex=True)
-    invalid_items_mask = df['itemName'].str.match(r'^[^\w]+$')
-    df = df[~invalid_items_mask]
-
-    df['orderId'] = df['orderId'].astype('Int64')
-    df['qty'] = df['qty'].astype('Int64')
-    df['orderTime'] = pd.to_datetime(df['orderTime'])
-    df = df[df['cancelReason'].isna()]
-    df = df.drop(columns=['cancelReason'])
-
-    df['qty'] = df.groupby(['orderId', 'categoryName', 'itemName'])['qty'].transform('sum')
-    df = df.drop_duplicates(subset=['orderId', 'categoryName', 'itemName'])
-
-    df['totalPrice'] = df['price'] * df['qty']
-    df = df[['orderId', 'categoryName', 'itemName', 'price', 'qty', 'totalPrice', 'orderTime']]
-
-    df['hour_in_day'] = df['orderTime'].dt.hour
-    df = df[(df['hour_in_day'] >= 9) & (df['hour_in_day'] <= 21)]
-    df = df.drop(columns=['hour_in_day'])
+# Column types for chunked CSV ingestion; names are categorical until they are normalized
+CSV_DTYPES = {
+    'orderId': 'Int64',
+    'categoryName': 'category',
+    'itemName': 'category',
+    'qty': 'Int64',
+    'cancelReason': 'object',
+}
+
+CSV_COLUMNS = ['orderId', 'categoryName', 'itemName', 'price', 'qty', 'orderTime', 'cancelReason']
+
+# Rows read per chunk by read_csv_in_chunks
+CSV_CHUNK_SIZE = 200_000
+
+
+def _normalize_values(series, normalize):
+    """
+    Apply a string normalization once per distinct value.
+
+    Returns the per-row codes and the normalized distinct values; code -1 (missing value)
+    picks the trailing NaN, so values[codes] gives the normalized column.
+    """
+    codes, uniques = pd.factorize(series)
+    normalized = normalize(pd.Series(np.asarray(uniques, dtype=object), dtype=object)).to_numpy(dtype=object)
+    return codes, np.append(normalized, np.nan)
+
+
+def _normalize_item_names(names):
+    names = names.str.lower().str.strip()
+    names = names.str.replace(r'[^a-zA-Z\s]', '', regex=True)
+    return names.str.replace(r'\s+', ' ', regex=True)
+
+
+def _parse_order_time(values, errors='raise'):
+    """Parse orderTime in the export format, falling back to pandas' format inference for other layouts."""
+    try:
+        return pd.to_datetime(values, format='%Y-%m-%d %H:%M')
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, errors=errors)
+
 
+def _clean_transactions(df, time_errors='raise'):
+    """Row-level cleaning of preprocess_data: parse time, normalize names, drop invalid and cancelled rows.
+
+    time_errors='coerce' turns unparseable orderTime values into NaT, like the CSV upload did.
+    """
+    item_codes, item_values = _normalize_values(df['itemName'], _normalize_item_names)
+    category_codes, category_values = _normalize_values(df['categoryName'], lambda names: names.str.lower())
+
+    invalid_items = pd.Series(item_values, dtype=object).str.match(r'^[^\w]+$', na=False).to_numpy(dtype=bool)
+    keep = ~invalid_items[item_codes]
+    if 'cancelReason' in df.columns:
+        keep &= df['cancelReason'].isna().to_numpy()
+
+    return pd.DataFrame({
+        'orderId': df['orderId'].astype('Int64').array[keep],
+        'categoryName': category_values[category_codes[keep]],
+        'itemName': item_values[item_codes[keep]],
+        'price': df['price'].array[keep],
+        'qty': df['qty'].astype('Int64').array[keep],
+        'orderTime': _parse_order_time(df['orderTime'], time_errors).to_numpy()[keep],
+    }, index=df.index[keep])
+
+
+def _merge_quantities(df):
+    """Sum qty of repeated (orderId, categoryName, itemName) rows into the first occurrence."""
+    keys = ['orderId', 'categoryName', 'itemName']
+    grouped = df.groupby(keys, sort=False, dropna=False)
+    group_ids = grouped.ngroup().to_numpy()
+    qty = grouped['qty'].sum().to_numpy()
+
+    first = ~pd.Series(group_ids).duplicated().to_numpy()
+    df = df[first].copy()
+    df['qty'] = pd.array(qty[group_ids[first]], dtype='Int64')
+    # Rows with a missing key are never grouped together, so their qty stays missing
+    df.loc[df[keys].isna().any(axis=1), 'qty'] = pd.NA
     return df
 
 
-def create_basket_sets(df):
-    transactions_str = df.groupby(['orderId', 'itemName'])['itemName'].count().reset_index(name='Count')
-    my_basket = transactions_str.pivot_table(index='orderId', columns='itemName', values='Count', aggfunc='sum').fillna(0)
-    my_basket = my_basket.astype('int64')
+def _finalize_transactions(df):
+    """Add totalPrice, fix the column order and keep the 09:00-21:59 service hours."""
+    hours = df['orderTime'].dt.hour
+    df = df[(hours >= 9) & (hours <= 21)]
+    return df.assign(totalPrice=df['price'] * df['qty'])[
+        ['orderId', 'categoryName', 'itemName', 'price', 'qty', 'totalPrice', 'orderTime']
+    ]
 
-    def encode(x):
-        if x <= 0:
-            return 0
-        if x >= 1:
-            return 1
 
-    my_basket_sets = my_basket.applymap(encode)
-    return my_basket_sets
+def preprocess_data(df):
+    df = _clean_transactions(df)
+    df = _merge_quantities(df)
+    return _finalize_transactions(df)
 
 
-def calculate_apriori(df, support=0.015, min_confidence=0.25, metric="lift", min_threshold=1):
+def missing_csv_columns(filepath_or_buffer, required_columns):
     """
-    Calculate Apriori algorithm and generate association rules.
+    List required columns absent from the header of a CSV, without reading its rows.
+
+    Parameters:
+    - filepath_or_buffer: Path or file-like object of the CSV; buffers are rewound afterwards.
+    - required_columns: Column names the data must have.
+
+    Returns:
+    - missing: Required columns not in the header, in the order of required_columns.
+    """
+    header = pd.read_csv(filepath_or_buffer, nrows=0).columns
+    if hasattr(filepath_or_buffer, 'seek'):
+        filepath_or_buffer.seek(0)
+    return [column for column in required_columns if column not in header]
+
+
+def read_csv_in_chunks(filepath_or_buffer, chunksize=CSV_CHUNK_SIZE):
+    """
+    Read and preprocess a transaction CSV chunk by chunk.
+
+    Each chunk is read with CSV_DTYPES, cleaned with the same rules as preprocess_data and
+    merged on its own, so only cleaned rows are kept in memory. Quantities of rows that
+    span chunk boundaries are merged once at the end. orderTime is parsed leniently:
+    other timestamp layouts are inferred and unparseable values become NaT. Check the
+    header with missing_csv_columns first.
+
+    Parameters:
+    - filepath_or_buffer: Path or file-like object of the CSV (e.g. a Streamlit upload).
+    - chunksize: Number of rows read per chunk.
+
+    Returns:
+    - df: DataFrame equal to preprocess_data(pd.read_csv(filepath_or_buffer)).
+    """
+    reader = pd.read_csv(
+        filepath_or_buffer,
+        usecols=lambda column: column in CSV_COLUMNS,
+        dtype=CSV_DTYPES,
+        chunksize=chunksize
+    )
+    chunks = [_merge_quantities(_clean_transactions(chunk, time_errors='coerce')) for chunk in reader]
+    df = pd.concat(chunks) if chunks else pd.DataFrame(columns=CSV_COLUMNS[:-1])
+    df = _merge_quantities(df)
+    return _finalize_transactions(df)
+
+
+def build_item_dictionary(df):
+    """
+    Build the item dictionary of a dataset: one integer id per normalized item name, plus its category.
+
+    Ids follow the sorted names, so ordering items by id orders them by name. When df already
+    has an itemId column (a saved dataset), the dictionary is read from its (itemId, itemName)
+    pairs, so it always matches the stored ids.
+
+    Parameters:
+    - df: Preprocessed transactions of the whole dataset (not just a date range).
+
+    Returns:
+    - item_dictionary: Dict with 'items' (names by id), 'item_ids' (name -> id) and 'categories'
+      (category by id; the most frequent one when an item is sold under several categories).
+    """
+    if 'itemId' in df.columns:
+        rows = df[['itemId', 'itemName', 'categoryName']][df['itemName'].notna() & (df['itemId'] >= 0)]
+        item_codes = rows['itemId'].to_numpy(dtype=np.int64)
+        items = np.full(item_codes.max(initial=-1) + 1, None, dtype=object)
+        items[item_codes] = np.asarray(rows['itemName'], dtype=object)
+    else:
+        rows = df[['itemName', 'categoryName']][df['itemName'].notna()]
+        item_codes, items = pd.factorize(rows['itemName'], sort=True)
+        items = np.asarray(items, dtype=object)
+    category_codes, categories = pd.factorize(rows['categoryName'], sort=True)
+
+    # Most frequent category per item, the first by name on ties; missing categories stay None
+    known = category_codes >= 0
+    pairs = pd.DataFrame({'item': item_codes[known], 'category': category_codes[known]}).value_counts().reset_index(name='count')
+    pairs = pairs.sort_values(['item', 'count', 'category'], ascending=[True, False, True]).drop_duplicates('item')
+    item_categories = np.full(len(items), None, dtype=object)
+    item_categories[pairs['item'].to_numpy()] = np.asarray(categories, dtype=object)[pairs['category'].to_numpy()]
+
+    return {
+        'items': items,
+        'item_ids': {item: item_id for item_id, item in enumerate(items.tolist())},
+        'categories': item_categories,
+    }
+
+
+def encode_items(names, item_dictionary):
+    """
+    Translate item names to dictionary ids, hashing every distinct name once.
+
+    Parameters:
+    - names: Series of item names (object or categorical).
+    - item_dictionary: Dict from build_item_dictionary.
+
+    Returns:
+    - item_ids: int32 array of ids, -1 for missing or unknown names.
+    """
+    codes, uniques = pd.factorize(names)
+    lookup = pd.Index(item_dictionary['items']).get_indexer(np.asarray(uniques, dtype=object))
+    lookup = np.append(lookup, -1).astype(np.int32)
+    return lookup[codes]
+
+
+def encode_itemsets(itemsets, item_dictionary):
+    """
+    Translate itemsets of item names to itemsets of dictionary ids.
+
+    Parameters:
+    - itemsets: Iterable of frozensets of item names.
+    - item_dictionary: Dict from build_item_dictionary.
+
+    Returns:
+    - itemsets: List of frozensets of item ids.
+    """
+    item_ids = item_dictionary['item_ids']
+    return [frozenset(item_ids[item] for item in itemset) for itemset in itemsets]
+
+
+def _item_ids(df, item_dictionary):
+    """Dictionary id of every row, from the itemId column when present."""
+    return df['itemId'].to_numpy() if 'itemId' in df.columns else encode_items(df['itemName'], item_dictionary)
+
+
+def basket_rows(df, item_dictionary=None, item_ids=None):
+    """
+    Rows of df that create_basket_sets puts in the basket matrix.
 
     Parameters:
     - df: DataFrame containing preprocessed transaction data.
-    - support: Minimum support threshold (default is 0.01).
+    - item_dictionary: Dict from build_item_dictionary, as passed to create_basket_sets.
+    - item_ids: Ids of the rows when already computed.
+
+    Returns:
+    - rows: Boolean array, True for rows with an order id and a (known) item.
+    """
+    if item_dictionary is None:
+        return (df['orderId'].notna() & df['itemName'].notna()).to_numpy()
+    if item_ids is None:
+        item_ids = _item_ids(df, item_dictionary)
+    return (item_ids >= 0) & df['orderId'].notna().to_numpy()
+
+
+def create_basket_sets(df, item_dictionary=None):
+    """
+    Build the one-hot basket matrix (orders x items) in a single vectorized pass.
+
+    Parameters:
+    - df: DataFrame containing preprocessed transaction data.
+    - item_dictionary: Dict from build_item_dictionary; when given, columns are item ids
+      (taken from the itemId column if present) instead of item names.
+
+    Returns:
+    - my_basket_sets: Boolean DataFrame indexed by orderId with one column per itemName
+      (or per itemId, in id order, which is name order).
+    """
+    if item_dictionary is not None:
+        item_ids = _item_ids(df, item_dictionary)
+        keep = basket_rows(df, item_dictionary, item_ids)
+        order_codes, order_ids = pd.factorize(df['orderId'][keep], sort=True)
+        column_ids, item_codes = np.unique(item_ids[keep], return_inverse=True)
+
+        basket = np.zeros((len(order_ids), len(column_ids)), dtype=bool)
+        basket[order_codes, item_codes] = True
+        return pd.DataFrame(
+            basket,
+            index=pd.Index(order_ids, name='orderId'),
+            columns=pd.Index(column_ids.astype(np.int32), name='itemId')
+        )
+
+    transactions = df[['orderId', 'itemName']][basket_rows(df)]
+    order_codes, order_ids = pd.factorize(transactions['orderId'], sort=True)
+    item_codes, item_names = pd.factorize(transactions['itemName'], sort=True)
+    # Categorical names (from storage.load_preprocessed) become plain labels
+    item_names = np.asarray(item_names, dtype=object)
+
+    basket = np.zeros((len(order_ids), len(item_names)), dtype=bool)
+    basket[order_codes, item_codes] = True
+
+    my_basket_sets = pd.DataFrame(
+        basket,
+        index=pd.Index(order_ids, name='orderId'),
+        columns=pd.Index(item_names, name='itemName')
+    )
+    return my_basket_sets
+
+
+def basket_memory_usage(basket_sets):
+    """
+    Report the memory footprint of a basket matrix next to the old dense int64 pivot.
+
+    Parameters:
+    - basket_sets: DataFrame returned by create_basket_sets.
+
+    Returns:
+    - usage: Dict with 'bytes' (current matrix) and 'dense_int64_bytes' (old pivot_table path).
+    """
+    n_orders, n_items = basket_sets.shape
+    return {
+        'bytes': int(basket_sets.memory_usage(index=True, deep=False).sum()),
+        'dense_int64_bytes': int(n_orders * n_items * np.dtype('int64').itemsize
+                                 + basket_sets.index.memory_usage(deep=False))
+    }
+
+
+MINING_ENGINES = ("apriori", "fpgrowth", "eclat", "native")
+
+# Number of set bits for every possible byte value, used when np.bitwise_count is unavailable
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# Upper bound (in bytes) for the intermediate bitsets built while counting candidates
+_CANDIDATE_CHUNK_BYTES = 64 * 1024 ** 2
+
+
+def pack_basket_sets(basket_sets):
+    """
+    Bit-pack every item column of a basket matrix.
+
+    Parameters:
+    - basket_sets: One-hot basket matrix from create_basket_sets.
+
+    Returns:
+    - packed: uint8 array of shape (n_items, ceil(n_orders / 8)), one bitset per item.
+    """
+    # Support counting gathers whole item rows, so keep them contiguous whatever the frame layout
+    return np.ascontiguousarray(np.packbits(basket_sets.to_numpy(dtype=bool).T, axis=1))
+
+
+def _popcount_bytes(bits):
+    """Number of set bits in every byte of a uint8 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits)
+    return _POPCOUNT_TABLE[bits]
+
+
+def _popcount(bits):
+    """Count the set bits along the last axis of a uint8 array."""
+    return _popcount_bytes(bits).sum(axis=-1, dtype=np.int64)
+
+
+def _support_counts(packed, candidates, byte_starts=None):
+    """
+    Count the orders containing each candidate itemset (rows of item indices).
+
+    With byte_starts, the packed orders are split into byte-aligned segments and the
+    result has one column per segment instead of a single total.
+    """
+    if byte_starts is None:
+        counts = np.empty(len(candidates), dtype=np.int64)
+    else:
+        counts = np.empty((len(candidates), len(byte_starts)), dtype=np.int64)
+    chunk = max(1, _CANDIDATE_CHUNK_BYTES // max(1, packed.shape[1]))
+    for start in range(0, len(candidates), chunk):
+        block = candidates[start:start + chunk]
+        bits = packed[block[:, 0]]
+        for col in range(1, block.shape[1]):
+            bits &= packed[block[:, col]]
+        if byte_starts is None:
+            counts[start:start + chunk] = _popcount(bits)
+        else:
+            counts[start:start + chunk] = np.add.reduceat(_popcount_bytes(bits), byte_starts, axis=1, dtype=np.int64)
+    return counts
+
+
+def _apriori_gen(itemsets):
+    """Join (k-1)-itemsets sharing a prefix into k-candidates and prune those with an infrequent subset."""
+    n, k = itemsets.shape
+    if k == 1:
+        left, right = np.triu_indices(n, k=1)
+        return np.column_stack([itemsets[left, 0], itemsets[right, 0]])
+
+    # Rows are sorted, so itemsets sharing the first k-1 items form contiguous groups
+    prefix_change = np.any(itemsets[1:, :-1] != itemsets[:-1, :-1], axis=1)
+    bounds = np.concatenate([[0], np.flatnonzero(prefix_change) + 1, [n]])
+    parts = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if hi - lo < 2:
+            continue
+        left, right = np.triu_indices(hi - lo, k=1)
+        parts.append(np.column_stack([itemsets[lo + left], itemsets[lo + right, -1]]))
+    if not parts:
+        return np.empty((0, k + 1), dtype=itemsets.dtype)
+    candidates = np.concatenate(parts)
+
+    # Every k-subset must be frequent; the two subsets used for the join already are
+    row_type = np.dtype((np.void, itemsets.dtype.itemsize * k))
+    known = np.ascontiguousarray(itemsets).view(row_type).ravel()
+    keep = np.ones(len(candidates), dtype=bool)
+    for drop in range(k - 1):
+        subset = np.ascontiguousarray(np.delete(candidates, drop, axis=1)).view(row_type).ravel()
+        keep &= np.isin(subset, known)
+    return candidates[keep]
+
+
+def _native_apriori(packed, min_count, count_supports=_support_counts):
+    """Level-wise Apriori over bit-packed item columns; yields (itemsets, counts) per level."""
+    counts = _popcount(packed)
+    itemsets = np.flatnonzero(counts >= min_count)[:, None]
+    counts = counts[itemsets[:, 0]]
+    while len(itemsets):
+        yield itemsets, counts
+        candidates = _apriori_gen(itemsets)
+        if not len(candidates):
+            break
+        counts = count_supports(packed, candidates)
+        keep = counts >= min_count
+        itemsets, counts = candidates[keep], counts[keep]
+
+
+def _native_eclat(packed, min_count):
+    """Depth-first Eclat over bit-packed item columns; yields (itemsets, counts) per prefix."""
+    counts = _popcount(packed)
+    frequent = np.flatnonzero(counts >= min_count)
+    yield frequent[:, None], counts[frequent]
+
+    stack = [((int(item),), packed[item], frequent[pos + 1:]) for pos, item in enumerate(frequent)]
+    while stack:
+        prefix, prefix_bits, tail = stack.pop()
+        if not len(tail):
+            continue
+        bits = packed[tail] & prefix_bits
+        tail_counts = _popcount(bits)
+        keep = np.flatnonzero(tail_counts >= min_count)
+        if not len(keep):
+            continue
+        extended = tail[keep]
+        yield np.column_stack([np.tile(prefix, (len(keep), 1)), extended]), tail_counts[keep]
+        for pos, idx in enumerate(keep):
+            stack.append((prefix + (int(tail[idx]),), bits[idx], extended[pos + 1:]))
+
+
+# Worker processes used by the page for native support counting; override with CKM_MINING_JOBS.
+# The speedup depends on the cores and memory bandwidth of the host, so measure before raising it.
+MINING_JOBS = int(os.environ.get("CKM_MINING_JOBS", 1))
+
+# Process pools reused across mining calls, one per worker count; mining jobs run on
+# several threads, so pools are created and dropped under _PROCESS_POOLS_LOCK
+_PROCESS_POOLS = {}
+_PROCESS_POOLS_LOCK = threading.Lock()
+
+def _count_partition(name, shape, candidates, byte_lo, byte_hi):
+    """
+    Support counts of candidates over one byte range (partition of orders) of the shared matrix.
+
+    The block is attached for this task only, so idle workers never keep an unlinked matrix mapped.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return _support_counts(np.ndarray(shape, dtype=np.uint8, buffer=block.buf)[:, byte_lo:byte_hi], candidates)
+    finally:
+        block.close()
+
+
+def _process_pool(n_jobs):
+    with _PROCESS_POOLS_LOCK:
+        if n_jobs not in _PROCESS_POOLS:
+            _PROCESS_POOLS[n_jobs] = ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context("spawn"))
+        return _PROCESS_POOLS[n_jobs]
+
+
+def _drop_process_pool(n_jobs, pool):
+    """Forget a pool whose worker died (e.g. killed for memory) so the next run starts a fresh one."""
+    with _PROCESS_POOLS_LOCK:
+        if _PROCESS_POOLS.get(n_jobs) is pool:
+            del _PROCESS_POOLS[n_jobs]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def _parallel_support_counter(packed, n_jobs):
+    """
+    Count Distribution: publish packed in shared memory and split every count across n_jobs
+    order partitions; workers count their partition and the partial counts are summed.
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(1, packed.nbytes))
+    try:
+        np.ndarray(packed.shape, dtype=np.uint8, buffer=block.buf)[:] = packed
+        pool = _process_pool(n_jobs)
+        bounds = np.linspace(0, packed.shape[1], n_jobs + 1).astype(int)
+
+        def count_supports(_, candidates):
+            try:
+                futures = [pool.submit(_count_partition, block.name, packed.shape, candidates, lo, hi)
+                           for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+                return sum(future.result() for future in futures)
+            except BrokenProcessPool:
+                _drop_process_pool(n_jobs, pool)
+                raise
+
+        yield count_supports
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _min_count(support, n_orders):
+    """Smallest order count whose support (count / n_orders) passes the same >= test mlxtend uses."""
+    if n_orders <= 0:
+        raise ValueError("No orders to mine; the selected data or date range is empty")
+    count = max(1, int(np.ceil(support * n_orders)))
+    while count > 1 and (count - 1) / n_orders >= support:
+        count -= 1
+    while count / n_orders < support:
+        count += 1
+    return count
+
+
+def _itemsets_frame(positions, supports, columns):
+    """Build the apriori-style frame from itemsets of column positions, ordered by length then position."""
+    order = sorted(range(len(positions)), key=lambda i: (len(positions[i]), positions[i]))
+    return pd.DataFrame({
+        'support': np.asarray(supports, dtype=np.float64)[order] if len(order) else np.empty(0),
+        'itemsets': [frozenset(columns[list(positions[i])]) for i in order]
+    })
+
+
+def find_frequent_itemsets(df, support=0.015, engine="apriori", n_jobs=1, progress=None):
+    """
+    Mine frequent itemsets with the selected backend.
+
+    Parameters:
+    - df: One-hot basket matrix from create_basket_sets (boolean or 0/1 values).
+    - support: Minimum support threshold.
+    - engine: "apriori" / "fpgrowth" (mlxtend), "eclat" or "native" (NumPy bitsets).
+    - n_jobs: Worker processes counting supports over order partitions (native engine only).
+    - progress: Optional callback receiving keyword updates (stage, level, candidates, itemsets)
+      while mining; the native engines report every level, mlxtend only start and end.
+
+    Returns:
+    - frequent_items: DataFrame with 'support' and 'itemsets' (frozensets of item names),
+      ordered by itemset length and column position whatever the engine. The support
+      floor is kept in frequent_items.attrs['min_support'].
+    """
+    if engine not in MINING_ENGINES:
+        raise ValueError(f"Unknown mining engine '{engine}', choose one of {MINING_ENGINES}")
+
+    if n_jobs > 1 and engine != "native":
+        raise ValueError("n_jobs > 1 is only supported by the native engine")
+
+    if progress is None:
+        def progress(**_):
+            pass
+
+    if not (df.dtypes == bool).all():
+        df = df.astype(bool)
+
+    progress(stage="mining", level=1, candidates=df.shape[1], itemsets=0)
+    if len(df) == 0:
+        # No orders (e.g. an empty date range): nothing is frequent
+        frequent_items = _itemsets_frame([], [], df.columns)
+    elif engine in ("apriori", "fpgrowth"):
+        miner = apriori if engine == "apriori" else fpgrowth
+        frequent_items = miner(df, min_support=support, use_colnames=False)
+        positions = [tuple(sorted(itemset)) for itemset in frequent_items['itemsets']]
+
+        frequent_items = _itemsets_frame(positions, frequent_items['support'].to_numpy(), df.columns)
+    else:
+        packed = pack_basket_sets(df)
+        positions, counts = [], []
+        with ExitStack() as stack:
+            if engine == "eclat":
+                levels = _native_eclat(packed, _min_count(support, len(df)))
+            else:
+                count_supports = _support_counts
+                if n_jobs > 1:
+                    count_supports = stack.enter_context(_parallel_support_counter(packed, n_jobs))
+
+                def reporting_counts(packed, candidates, count_supports=count_supports):
+                    progress(level=candidates.shape[1], candidates=len(candidates), itemsets=len(positions))
+                    return count_supports(packed, candidates)
+
+                levels = _native_apriori(packed, _min_count(support, len(df)), reporting_counts)
+            for itemsets, itemset_counts in levels:
+                positions.extend(map(tuple, itemsets.tolist()))
+                counts.extend(itemset_counts.tolist())
+                progress(level=itemsets.shape[1], itemsets=len(positions))
+        frequent_items = _itemsets_frame(positions, np.asarray(counts, dtype=np.float64) / len(df), df.columns)
+
+    progress(stage="done", itemsets=len(frequent_items))
+    # Remember the floor so cheaper thresholds can be derived later by filtering
+    frequent_items.attrs['min_support'] = support
+    return frequent_items
+
+
+# Itemsets rules are generated from: every frequent itemset, or only closed / maximal ones
+ITEMSET_KINDS = ("all", "closed", "maximal")
+
+# Metric columns of association rules, in mlxtend order
+RULE_METRICS = ("antecedent support", "consequent support", "support", "confidence", "lift",
+                "leverage", "conviction", "zhangs_metric")
+
+
+# Metric columns used by the pages (table, graph, charts and recommendations)
+DISPLAY_RULE_METRICS = ("antecedent support", "consequent support", "support", "confidence", "lift")
+
+
+def _rules_frame(antecedents, consequents, sAC, sA, sC, metrics=RULE_METRICS):
+    """Rules frame with the requested mlxtend association_rules columns computed from the three supports."""
+    sAC, sA, sC = (np.asarray(values, dtype=np.float64) for values in (sAC, sA, sC))
+    columns = {'antecedents': antecedents, 'consequents': consequents}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        confidence = sAC / sA
+        leverage = sAC - sA * sC
+        for metric in metrics:
+            if metric == 'antecedent support':
+                columns[metric] = sA
+            elif metric == 'consequent support':
+                columns[metric] = sC
+            elif metric == 'support':
+                columns[metric] = sAC
+            elif metric == 'confidence':
+                columns[metric] = confidence
+            elif metric == 'lift':
+                columns[metric] = confidence / sC
+            elif metric == 'leverage':
+                columns[metric] = leverage
+            elif metric == 'conviction':
+                columns[metric] = np.where(confidence < 1.0, (1.0 - sC) / (1.0 - confidence), np.inf)
+            elif metric == 'zhangs_metric':
+                denominator = np.maximum(sAC * (1 - sA), sA * (sC - sAC))
+                columns[metric] = np.where(denominator == 0, 0, leverage / denominator)
+            else:
+                raise ValueError(f"Unknown rule metric '{metric}', choose from {RULE_METRICS}")
+    return pd.DataFrame(columns, columns=['antecedents', 'consequents', *metrics])
+
+
+def _fused_rules(frequent_items, min_confidence, min_lift, metrics):
+    """
+    Generate only the rules passing min_confidence and min_lift, growing consequents level-wise.
+
+    For a fixed itemset, moving items from the antecedent to the consequent can only lower the
+    confidence, so a consequent is extended only if all its one-item-smaller consequents passed.
+    """
+    supports = dict(zip(frequent_items['itemsets'], frequent_items['support']))
+    antecedents, consequents, rule_supports = [], [], []
+    for itemset, sAC in supports.items():
+        if len(itemset) < 2:
+            continue
+        candidates = [(item,) for item in sorted(itemset)]
+        while candidates:
+            passed = []
+            for candidate in candidates:
+                consequent = frozenset(candidate)
+                antecedent = itemset - consequent
+                sA = supports[antecedent]
+                if sAC / sA < min_confidence:
+                    continue
+                passed.append(candidate)
+                sC = supports[consequent]
+                if sAC / sA / sC >= min_lift:
+                    antecedents.append(antecedent)
+                    consequents.append(consequent)
+                    rule_supports.append((sAC, sA, sC))
+
+            # Join passing consequents sharing all but the last item; the antecedent must stay non-empty
+            if not passed or len(passed[0]) + 1 >= len(itemset):
+                break
+            passed_set = set(passed)
+            candidates = [
+                first + second[-1:]
+                for position, first in enumerate(passed)
+                for second in passed[position + 1:]
+                if first[:-1] == second[:-1]
+                and all(subset in passed_set for subset in combinations(first + second[-1:], len(first)))
+            ]
+
+    sAC, sA, sC = np.array(rule_supports, dtype=np.float64).reshape(-1, 3).T
+    return _rules_frame(antecedents, consequents, sAC, sA, sC, metrics)
+
+
+def _itemset_flags(frequent_items):
+    """Closed, maximal and generator flags of every itemset, from its immediate supersets and subsets."""
+    supports = dict(zip(frequent_items['itemsets'], frequent_items['support']))
+    has_superset, has_equal_superset = set(), set()
+    has_equal_subset = {itemset for itemset, support in supports.items() if len(itemset) == 1 and support >= 1.0}
+    for itemset, support in supports.items():
+        if len(itemset) < 2:
+            continue
+        # An equal-support superset exists iff one exists one item larger (support is anti-monotone)
+        for item in itemset:
+            subset = itemset - {item}
+            has_superset.add(subset)
+            if supports[subset] == support:
+                has_equal_superset.add(subset)
+                has_equal_subset.add(itemset)
+
+    itemsets = frequent_items['itemsets']
+    return (
+        np.fromiter((itemset not in has_equal_superset for itemset in itemsets), dtype=bool, count=len(itemsets)),
+        np.fromiter((itemset not in has_superset for itemset in itemsets), dtype=bool, count=len(itemsets)),
+        np.fromiter((itemset not in has_equal_subset for itemset in itemsets), dtype=bool, count=len(itemsets))
+    )
+
+
+def condense_itemsets(frequent_items, kind="closed"):
+    """
+    Keep only the closed or maximal frequent itemsets.
+
+    Parameters:
+    - frequent_items: DataFrame returned by find_frequent_itemsets.
+    - kind: "closed" (no superset with the same support) or "maximal" (no frequent superset).
+
+    Returns:
+    - condensed_items: The matching rows of frequent_items, in the same order.
+    """
+    if kind not in ITEMSET_KINDS[1:]:
+        raise ValueError(f"Unknown itemset kind '{kind}', choose 'closed' or 'maximal'")
+
+    closed, maximal, _ = _itemset_flags(frequent_items)
+    condensed_items = frequent_items[closed if kind == "closed" else maximal].reset_index(drop=True)
+    condensed_items.attrs = dict(frequent_items.attrs)
+    return condensed_items
+
+
+def _nonredundant_rules(frequent_items, kind, min_confidence, metric, min_threshold, metrics):
+    """Rules G -> C - G with C a closed (or maximal) itemset and G a generator strictly inside C."""
+    closed, maximal, generator = _itemset_flags(frequent_items)
+    supports = dict(zip(frequent_items['itemsets'], frequent_items['support']))
+    generators = set(frequent_items['itemsets'][generator])
+    condensed = frequent_items[closed if kind == "closed" else maximal]
+
+    antecedents, consequents, rule_supports = [], [], []
+    for itemset, sAC in zip(condensed['itemsets'], condensed['support']):
+        for size in range(len(itemset) - 1, 0, -1):
+            for antecedent in map(frozenset, combinations(itemset, size)):
+                if antecedent not in generators:
+                    continue
+                sA = supports[antecedent]
+                if sAC / sA < min_confidence:
+                    continue
+                consequent = itemset - antecedent
+                antecedents.append(antecedent)
+                consequents.append(consequent)
+                rule_supports.append((sAC, sA, supports[consequent]))
+
+    sAC, sA, sC = np.array(rule_supports, dtype=np.float64).reshape(-1, 3).T
+    rules = _rules_frame(antecedents, consequents, sAC, sA, sC, tuple(dict.fromkeys((*metrics, metric))))
+    return rules[rules[metric] >= min_threshold][['antecedents', 'consequents', *metrics]]
+
+
+def generate_rules(frequent_items, support=0.015, min_confidence=0.25, metric="lift", min_threshold=1, itemsets="all",
+                   metrics=RULE_METRICS):
+    """
+    Generate association rules from itemsets mined at or below the requested support.
+
+    Any support at or above the floor of frequent_items gives the same rules as mining
+    at that support directly, so presets sharing a floor only need one mining pass.
+
+    Parameters:
+    - frequent_items: DataFrame returned by find_frequent_itemsets.
+    - support: Minimum support threshold, not lower than the mining floor.
+    - min_confidence: Minimum confidence threshold for the rules.
     - metric: Metric for association rule evaluation (default is "lift").
     - min_threshold: Minimum threshold for the metric (default is 1).
-    - min_confidence: Minimum confidence threshold for the rules (default is 0.5).
+    - itemsets: One of ITEMSET_KINDS. "closed" keeps only non-redundant rules: the antecedent
+      is a minimal generator and antecedent plus consequent is a closed itemset, which carries
+      the same support/confidence information as all rules. "maximal" further restricts the
+      union to maximal itemsets.
+    - metrics: Metric columns to compute, from RULE_METRICS (DISPLAY_RULE_METRICS is enough for
+      the pages). Confidence is always included.
 
     Returns:
     - rules: DataFrame containing association rules filtered by minimum confidence.
     """
-    df = df.astype(bool)
-    
-    # Generate frequent itemsets with apriori
-    frequent_items = apriori(df, min_support=support, use_colnames=True)
-    
-    # Generate association rules with the specified metric and min_threshold
-    rules = association_rules(frequent_items, metric=metric, min_threshold=min_threshold)
-    
+    floor = frequent_items.attrs.get('min_support', support)
+    if support < floor:
+        raise ValueError(f"Support {support} is below the mining floor {floor}, mine again with a lower support")
+
+    if itemsets not in ITEMSET_KINDS:
+        raise ValueError(f"Unknown itemset kind '{itemsets}', choose one of {ITEMSET_KINDS}")
+    if not set(metrics) <= set(RULE_METRICS):
+        raise ValueError(f"Unknown rule metrics {sorted(set(metrics) - set(RULE_METRICS))}, choose from {RULE_METRICS}")
+    metrics = tuple(column for column in RULE_METRICS if column in metrics or column == 'confidence')
+
+    if support > floor:
+        frequent_items = frequent_items[frequent_items['support'] >= support].reset_index(drop=True)
+
+    # Generate association rules with the specified metric and min_threshold; confidence and lift
+    # thresholds are applied while generating, other metrics go through mlxtend
+    if itemsets != "all":
+        rules = _nonredundant_rules(frequent_items, itemsets, min_confidence, metric, min_threshold, metrics)
+    elif metric in ("confidence", "lift"):
+        if metric == "confidence":
+            rules = _fused_rules(frequent_items, max(min_confidence, min_threshold), -np.inf, metrics)
+        else:
+            rules = _fused_rules(frequent_items, min_confidence, min_threshold, metrics)
+    else:
+        rules = association_rules(frequent_items, metric=metric, min_threshold=min_threshold)
+        rules = rules[['antecedents', 'consequents', *metrics]]
+
     # Filter rules by min_confidence
     rules = rules[rules['confidence'] >= min_confidence]
     
@@ -81,168 +809,980 @@ def calculate_apriori(df, support=0.015, min_confidence=0.25, metric="lift", min
     return rules
 
 
+def calculate_apriori(df, support=0.015, min_confidence=0.25, metric="lift", min_threshold=1, engine="apriori", n_jobs=1,
+                      progress=None, itemsets="all"):
+    """
+    Calculate Apriori algorithm and generate association rules.
+
+    Parameters:
+    - df: One-hot basket matrix from create_basket_sets (boolean or 0/1 values).
+    - support: Minimum support threshold (default is 0.01).
+    - metric: Metric for association rule evaluation (default is "lift").
+    - min_threshold: Minimum threshold for the metric (default is 1).
+    - min_confidence: Minimum confidence threshold for the rules (default is 0.5).
+    - engine: Frequent itemset backend, one of MINING_ENGINES (default is "apriori").
+    - n_jobs: Worker processes for support counting (native engine only).
+    - progress: Optional mining progress callback, see find_frequent_itemsets.
+    - itemsets: "all", or "closed" / "maximal" for non-redundant rules only (see generate_rules).
+
+    Returns:
+    - rules: DataFrame containing association rules filtered by minimum confidence.
+    """
+    # Generate frequent itemsets with the selected engine
+    frequent_items = find_frequent_itemsets(df, support=support, engine=engine, n_jobs=n_jobs, progress=progress)
+    
+    return generate_rules(frequent_items, support=support, min_confidence=min_confidence,
+                          metric=metric, min_threshold=min_threshold, itemsets=itemsets)
+
+
+def find_top_k_rules(df, k=50, min_confidence=0.25, min_lift=1, progress=None):
+    """
+    Mine the k association rules with the highest support, without choosing a minimum support.
+
+    Itemsets are explored best-first in order of decreasing support (TopKRules-style): the
+    support threshold starts at one order and is raised to the support of the k-th best rule
+    found so far, so itemsets below it are never counted or expanded.
+
+    Parameters:
+    - df: One-hot basket matrix from create_basket_sets (boolean or 0/1 values).
+    - k: Number of rules to return.
+    - min_confidence: Minimum confidence threshold for the rules.
+    - min_lift: Minimum lift of the rules (default is 1, as in generate_rules).
+    - progress: Optional callback receiving keyword updates (stage, itemsets, rules, min_support).
+
+    Returns:
+    - rules: DataFrame like generate_rules with the k highest-support rules (ties broken by
+      confidence), sorted by confidence. The support reached is kept in rules.attrs['min_support'].
+    """
+    if progress is None:
+        def progress(**_):
+            pass
+
+    if not (df.dtypes == bool).all():
+        df = df.astype(bool)
+
+    packed = pack_basket_sets(df)
+    n_orders = len(df)
+    item_counts = _popcount(packed)
+    counts = {(item,): count for item, count in enumerate(item_counts.tolist())}
+
+    def count_of(itemset):
+        if itemset not in counts:
+            counts[itemset] = int(_popcount(np.bitwise_and.reduce(packed[list(itemset)], axis=0)))
+        return counts[itemset]
+
+    # top: min-heap of the best rules as (count, confidence, -discovery order, antecedent, consequent)
+    top = []
+    found = 0
+    # candidates: max-heap on count; children keep a reference to their parent's order bits
+    candidates = [(-count, (item,), None) for item, count in enumerate(item_counts.tolist()) if count > 0]
+    heapq.heapify(candidates)
+    expanded = 0
+    progress(stage="mining", itemsets=0, rules=0, min_support=0.0)
+    while candidates:
+        negative_count, itemset, parent_bits = heapq.heappop(candidates)
+        count = -negative_count
+        if len(top) == k and count < top[0][0]:
+            break
+        bits = packed[itemset[-1]] if parent_bits is None else parent_bits & packed[itemset[-1]]
+
+        # Every rule X -> itemset \ X has the itemset's support
+        for size in range(1, len(itemset)):
+            for antecedent in combinations(itemset, size):
+                consequent = tuple(item for item in itemset if item not in antecedent)
+                confidence = count / count_of(antecedent)
+                if confidence < min_confidence or confidence * n_orders / count_of(consequent) < min_lift:
+                    continue
+                rule = (count, confidence, -found, antecedent, consequent)
+                found += 1
+                if len(top) < k:
+                    heapq.heappush(top, rule)
+                elif rule > top[0]:
+                    heapq.heapreplace(top, rule)
+
+        # Extend with later items, skipping extensions below the current threshold
+        min_count = top[0][0] if len(top) == k else 1
+        tail = np.arange(itemset[-1] + 1, packed.shape[0])
+        tail = tail[item_counts[tail] >= min_count]
+        if len(tail):
+            tail_counts = _popcount(packed[tail] & bits)
+            keep = tail_counts >= min_count
+            for item, tail_count in zip(tail[keep].tolist(), tail_counts[keep].tolist()):
+                counts[itemset + (item,)] = tail_count
+                heapq.heappush(candidates, (-tail_count, itemset + (item,), bits))
+
+        expanded += 1
+        if expanded % 100 == 0:
+            progress(itemsets=expanded, rules=len(top), min_support=min_count / n_orders)
+
+    if not top:
+        raise ValueError("No rules satisfy the confidence and lift thresholds, lower min_confidence")
+
+    # Let mlxtend compute the usual metric columns from the selected itemsets and their subsets
+    supports = {}
+    for _, _, _, antecedent, consequent in top:
+        itemset = tuple(sorted(antecedent + consequent))
+        for size in range(1, len(itemset) + 1):
+            for subset in combinations(itemset, size):
+                supports[subset] = count_of(subset) / n_orders
+    frequent_items = _itemsets_frame(list(supports), list(supports.values()), df.columns)
+    rules = association_rules(frequent_items, metric="confidence", min_threshold=0)
+
+    selected = {(frozenset(df.columns[list(antecedent)]), frozenset(df.columns[list(consequent)]))
+                for _, _, _, antecedent, consequent in top}
+    rules = rules[[rule in selected for rule in zip(rules['antecedents'], rules['consequents'])]]
+    rules = rules.sort_values('confidence', ascending=False)
+    rules.attrs['min_support'] = top[0][0] / n_orders
+
+    progress(stage="done", itemsets=expanded, rules=len(rules), min_support=rules.attrs['min_support'])
+    return rules
+
+
+def _align_buckets(periods, counts, target):
+    """Add the rows of counts (one per period of periods) into zero rows over the target periods."""
+    aligned = np.zeros((len(target),) + counts.shape[1:], dtype=counts.dtype)
+    np.add.at(aligned, target.get_indexer(periods), counts)
+    return aligned
+
+
+def init_incremental_mining(df, basket_sets, support=0.015, n_jobs=1):
+    """
+    Mine a basket matrix and keep what is needed to update the result incrementally.
+
+    The state only holds daily counts of the frequent itemsets; the bit-packed orders are
+    returned separately as a block the caller keeps (e.g. on disk) and hands back to
+    update_incremental_mining through its history loader.
+
+    Parameters:
+    - df: Transactions of the basket orders (orderId and orderTime).
+    - basket_sets: One-hot basket matrix of df from create_basket_sets; label the columns
+      with item names so the state stays valid when item ids are renumbered.
+    - support: Minimum support threshold.
+    - n_jobs: Worker processes counting supports over order partitions.
+
+    Returns:
+    - state: Picklable dict with the item order, the frequent itemsets (tuples of item
+      positions), 'periods', 'orders' and 'counts' per day, the support and the last order time.
+    - block: Dict with the bit-packed orders grouped by day.
+    """
+    block = _bucket_block(df, basket_sets)
+    itemsets = []
+    with ExitStack() as stack:
+        count_supports = _support_counts
+        if n_jobs > 1:
+            count_supports = stack.enter_context(_parallel_support_counter(block['packed'], n_jobs))
+        for level, _ in _native_apriori(block['packed'], _min_count(support, len(basket_sets)), count_supports):
+            itemsets.extend(map(tuple, level.tolist()))
+
+    state = {
+        'items': pd.Index(basket_sets.columns),
+        'itemsets': itemsets,
+        'periods': block['periods'],
+        'orders': block['orders'],
+        'counts': _bucket_counts_by_length(block['packed'], itemsets, block['byte_starts']),
+        'min_support': support,
+        'last_order_time': block['last_order_time'],
+    }
+    return state, block
+
+
+def update_incremental_mining(state, df, basket_sets, history):
+    """
+    Add orders placed after state['last_order_time'] to an incremental mining state (FUP-style update).
+
+    An itemset frequent after the update must be frequent in the old orders or in the
+    new ones. Known frequent itemsets are counted on the new orders only; itemsets
+    frequent in the new orders but not tracked yet are the only ones rescanned in
+    history, and history is only loaded when there are such itemsets. The work and the
+    returned block are proportional to the new orders, not to the history.
+
+    Parameters:
+    - state: Dict from init_incremental_mining; updated in place.
+    - df: Transactions of the new orders only (orderId and orderTime).
+    - basket_sets: One-hot basket matrix of df from create_basket_sets.
+    - history: Function without arguments returning the blocks of every order already
+      in state (from init_incremental_mining and earlier updates).
+
+    Returns:
+    - changes: DataFrame with 'support', 'itemsets' and 'status' ("promoted" when an itemset
+      crossed the support threshold, "demoted" when it dropped below).
+    - block: Dict with the bit-packed new orders, to be kept with the history.
+    """
+    support = state['min_support']
+    items = state['items'].append(pd.Index(basket_sets.columns).difference(state['items'], sort=False))
+    block = _bucket_block(df, basket_sets, items)
+    n_new = len(basket_sets)
+    n_total = int(state['orders'].sum()) + n_new
+    periods = state['periods'].append(block['periods']).unique().sort_values()
+
+    known = state['itemsets']
+    counts = (_align_buckets(state['periods'], state['counts'], periods)
+              + _align_buckets(block['periods'], _bucket_counts_by_length(block['packed'], known, block['byte_starts']), periods))
+
+    # Candidates: frequent among the new orders but not tracked before
+    tracked = set(known)
+    candidates = []
+    if n_new:
+        for level, _ in _native_apriori(block['packed'], _min_count(support, n_new)):
+            candidates.extend(itemset for itemset in map(tuple, level.tolist()) if itemset not in tracked)
+    candidate_counts = _align_buckets(block['periods'], _bucket_counts_by_length(block['packed'], candidates, block['byte_starts']), periods)
+    if candidates:
+        # Items first seen in the new orders are absent (count zero) in older blocks
+        for old in history():
+            candidate_counts += _align_buckets(old['periods'], _bucket_counts_by_length(old['packed'], candidates, old['byte_starts']), periods)
+
+    itemsets = known + candidates
+    counts = np.hstack([counts, candidate_counts])
+    totals = counts.sum(axis=0)
+    frequent = totals >= _min_count(support, n_total)
+    promoted = [position for position in range(len(known), len(itemsets)) if frequent[position]]
+    demoted = [position for position in range(len(known)) if not frequent[position]]
+
+    changes = _itemsets_frame([itemsets[position] for position in promoted + demoted],
+                              totals[promoted + demoted].astype(np.float64) / n_total, items)
+    status = {frozenset(items[list(itemsets[position])]): "promoted" for position in promoted}
+    changes['status'] = [status.get(itemset, "demoted") for itemset in changes['itemsets']]
+
+    state.update(
+        items=items,
+        itemsets=[itemset for itemset, kept in zip(itemsets, frequent) if kept],
+        periods=periods,
+        orders=_align_buckets(state['periods'], state['orders'], periods) + _align_buckets(block['periods'], block['orders'], periods),
+        counts=counts[:, frequent],
+        last_order_time=block['last_order_time'] if n_new else state['last_order_time'],
+    )
+    return changes, block
+
+
+def incremental_bucket_counts(state):
+    """
+    Daily counts of the frequent itemsets of an incremental mining state.
+
+    Parameters:
+    - state: Dict from init_incremental_mining / update_incremental_mining.
+
+    Returns:
+    - bucket_counts: Dict like bucket_itemset_counts, usable with window_frequent_itemsets.
+      Itemsets are listed as find_frequent_itemsets orders them for sorted basket columns,
+      so the window over every day matches mining all orders at once.
+    """
+    items = state['items']
+    order = items.argsort()
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    ranked = [tuple(sorted(rank[list(itemset)].tolist())) for itemset in state['itemsets']]
+    listed = sorted(range(len(ranked)), key=lambda position: (len(ranked[position]), ranked[position]))
+    sorted_items = items[order]
+    return {
+        'periods': state['periods'],
+        'orders': state['orders'],
+        'itemsets': [frozenset(sorted_items[list(ranked[position])]) for position in listed],
+        'counts': state['counts'][:, listed],
+        'min_support': state['min_support'],
+    }
+
 
-def display_association_rules(rules):
+def _bucket_block(df, basket_sets, items=None, freq='D'):
+    """
+    Bit-pack a basket matrix with its orders grouped by time bucket of orderTime.
+
+    Each bucket is padded to whole bytes so buckets never share a byte, and per-bucket
+    counts are one reduceat over the popcounts of a candidate's bitset.
+
+    Returns a dict with 'packed' (one row per item of items, default the basket columns),
+    'byte_starts' (first byte of each bucket), 'periods', 'orders' (orders per bucket) and
+    'last_order_time'.
+    """
+    order_times = df.groupby('orderId')['orderTime'].min().reindex(basket_sets.index)
+    codes, periods = pd.factorize(order_times.dt.to_period(freq), sort=True)
+
+    sizes = np.bincount(codes, minlength=len(periods))
+    padded = (sizes + 7) // 8 * 8
+    starts = np.cumsum(padded) - padded
+    order = np.argsort(codes, kind='stable')
+    within = np.arange(len(order)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    if items is not None:
+        basket_sets = basket_sets.reindex(columns=items, fill_value=False)
+    matrix = np.zeros((padded.sum(), basket_sets.shape[1]), dtype=bool)
+    matrix[starts[codes[order]] + within] = basket_sets.to_numpy(dtype=bool)[order]
+
+    return {
+        # Support counting gathers whole item rows, so keep them contiguous
+        'packed': np.ascontiguousarray(np.packbits(matrix.T, axis=1)),
+        'byte_starts': starts // 8,
+        'periods': pd.PeriodIndex(periods, freq=freq),
+        'orders': sizes,
+        'last_order_time': order_times.max(),
+    }
+
+
+def _bucket_counts_by_length(packed, itemsets, byte_starts):
+    """
+    Per-bucket counts (buckets x itemsets) for itemsets (tuples of item positions) of mixed
+    lengths; itemsets with an item beyond the rows of packed count zero.
+    """
+    counts = np.zeros((len(byte_starts), len(itemsets)), dtype=np.int32)
+    by_length = {}
+    for position, itemset in enumerate(itemsets):
+        by_length.setdefault(len(itemset), []).append(position)
+    for positions in by_length.values():
+        candidates = np.array([itemsets[position] for position in positions], dtype=np.int64)
+        present = (candidates < packed.shape[0]).all(axis=1)
+        if len(byte_starts) and present.any():
+            counts[:, np.array(positions)[present]] = _support_counts(packed, candidates[present], byte_starts=byte_starts).T
+    return counts
+
+
+def bucket_itemset_counts(df, basket_sets, frequent_items, freq='D'):
+    """
+    Count already mined itemsets per time bucket of orderTime (day, week or month).
+
+    The itemsets of frequent_items (mined over the whole data at the floor support) are
+    tracked; every bucket gets the count of each of them, so any range of buckets is
+    answered by summing counts instead of mining raw transactions again (see
+    window_frequent_itemsets for when such an answer is exact). Count daily buckets once
+    and derive weeks or months with resample_bucket_counts.
+
+    Parameters:
+    - df: DataFrame containing preprocessed transaction data (orderId and orderTime).
+    - basket_sets: One-hot basket matrix of df from create_basket_sets.
+    - frequent_items: DataFrame with 'itemsets' over the basket columns, e.g. from
+      find_frequent_itemsets; attrs['min_support'] is kept as the support floor.
+    - freq: Bucket size as a pandas period alias ('D', 'W' or 'M').
+
+    Returns:
+    - bucket_counts: Dict with 'periods' (PeriodIndex), 'orders' (orders per bucket),
+      'itemsets' (list of frozensets), 'counts' (buckets x itemsets int32 array) and 'min_support'.
+    """
+    block = _bucket_block(df, basket_sets, freq=freq)
+    itemsets = list(frequent_items['itemsets'])
+    positions = [tuple(sorted(basket_sets.columns.get_indexer(list(itemset)).tolist())) for itemset in itemsets]
+    return {
+        'periods': block['periods'],
+        'orders': block['orders'],
+        'itemsets': itemsets,
+        'counts': _bucket_counts_by_length(block['packed'], positions, block['byte_starts']),
+        'min_support': frequent_items.attrs.get('min_support', 0.0),
+    }
+
+
+def resample_bucket_counts(bucket_counts, freq):
+    """
+    Merge bucket counts into coarser buckets, e.g. daily counts into weeks or months.
+
+    Parameters:
+    - bucket_counts: Dict from bucket_itemset_counts.
+    - freq: Coarser pandas period alias ('W' or 'M').
+
+    Returns:
+    - bucket_counts: Dict like bucket_itemset_counts with one bucket per freq period.
+    """
+    codes, periods = pd.factorize(bucket_counts['periods'].start_time.to_period(freq), sort=True)
+    # Buckets are in time order, so each coarse period is one run of consecutive rows
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=np.int64)
+    counts = bucket_counts['counts']
+    return {
+        **bucket_counts,
+        'periods': pd.PeriodIndex(periods),
+        'orders': np.add.reduceat(bucket_counts['orders'], starts) if len(starts) else bucket_counts['orders'][:0],
+        'counts': np.add.reduceat(counts, starts, axis=0) if len(starts) else counts[:0],
+    }
+
+
+def rule_itemsets(rules):
+    """
+    Itemsets needed to track rules over time: every antecedent, consequent and their union.
+
+    Parameters:
+    - rules: DataFrame containing association rules (frozenset sides), e.g. from find_top_k_rules.
+
+    Returns:
+    - itemsets: DataFrame with 'itemsets', usable with bucket_itemset_counts; the support
+      floor of rules.attrs['min_support'] is kept when present.
+    """
+    itemsets = dict.fromkeys(
+        itemset
+        for antecedent, consequent in zip(rules['antecedents'], rules['consequents'])
+        for itemset in (antecedent, consequent, antecedent | consequent)
+    )
+    itemsets = pd.DataFrame({'itemsets': list(itemsets)})
+    itemsets.attrs['min_support'] = rules.attrs.get('min_support', 0.0)
+    return itemsets
+
+
+def _bucket_mask(bucket_counts, start_date=None, end_date=None):
+    """Buckets whose start lies within [start_date, end_date]."""
+    bucket_starts = bucket_counts['periods'].start_time
+    mask = np.ones(len(bucket_starts), dtype=bool)
+    if start_date is not None:
+        mask &= bucket_starts >= pd.Timestamp(start_date).to_period(bucket_counts['periods'].freq).start_time
+    if end_date is not None:
+        mask &= bucket_starts <= pd.Timestamp(end_date)
+    return mask
+
+
+def window_frequent_itemsets(bucket_counts, start_date=None, end_date=None, support=None):
+    """
+    Frequent itemsets of a date range, summed from bucket counts.
+
+    Only the itemsets tracked in bucket_counts can be returned. An untracked itemset was
+    below the floor over all N orders, so it occurs in fewer than _min_count(floor, N)
+    orders of any range; the result is therefore exact for every support at or above
+    attrs['exact_support'], and may miss itemsets that are only frequent inside the range
+    below it.
+
+    Parameters:
+    - bucket_counts: Dict from bucket_itemset_counts over the whole data.
+    - start_date: First date of the range (the bucket containing it is included).
+    - end_date: Last date of the range.
+    - support: Minimum support in the range (default is the floor of bucket_counts).
+
+    Returns:
+    - frequent_items: DataFrame with 'support' and 'itemsets'; usable with generate_rules.
+      attrs holds 'min_support', 'n_orders' (orders in the range) and 'exact_support'.
+    """
+    support = bucket_counts['min_support'] if support is None else support
+    if support < bucket_counts['min_support']:
+        raise ValueError(f"support must be at least the floor of the bucket counts ({bucket_counts['min_support']})")
+
+    mask = _bucket_mask(bucket_counts, start_date, end_date)
+    n_orders = int(bucket_counts['orders'][mask].sum())
+    supports = bucket_counts['counts'][mask].sum(axis=0) / max(1, n_orders)
+    keep = (supports >= support) & (n_orders > 0)
+
+    frequent_items = pd.DataFrame({
+        'support': supports[keep],
+        'itemsets': [itemset for itemset, kept in zip(bucket_counts['itemsets'], keep) if kept]
+    })
+    frequent_items.attrs['min_support'] = support
+    frequent_items.attrs['n_orders'] = n_orders
+    n_total = int(bucket_counts['orders'].sum())
+    frequent_items.attrs['exact_support'] = _min_count(bucket_counts['min_support'], n_total) / n_orders if n_orders else 1.0
+    return frequent_items
+
+
+def window_bucket_counts(bucket_counts, start_date=None, end_date=None):
+    """
+    Bucket counts restricted to the buckets of a date range, e.g. for rule_trends.
+
+    Parameters:
+    - bucket_counts: Dict from bucket_itemset_counts.
+    - start_date: First date of the range (the bucket containing it is included).
+    - end_date: Last date of the range.
+
+    Returns:
+    - bucket_counts: Dict like bucket_itemset_counts with only the buckets of the range.
+    """
+    mask = _bucket_mask(bucket_counts, start_date, end_date)
+    return {
+        **bucket_counts,
+        'periods': bucket_counts['periods'][mask],
+        'orders': bucket_counts['orders'][mask],
+        'counts': bucket_counts['counts'][mask],
+    }
+
+
+def rule_trends(bucket_counts, rules, window=1, item_dictionary=None):
+    """
+    Support, confidence and lift of each rule per time bucket.
+
+    Parameters:
+    - bucket_counts: Dict from bucket_itemset_counts.
+    - rules: DataFrame containing association rules (frozenset or comma-joined sides).
+    - window: Number of consecutive buckets summed per point (rolling window).
+    - item_dictionary: Dict from build_item_dictionary, used to label rules of item ids.
+
+    Returns:
+    - trends: Long DataFrame with 'period', 'rule', 'support', 'confidence' and 'lift'.
+    """
+    columns = {itemset: position for position, itemset in enumerate(bucket_counts['itemsets'])}
+    counts = pd.DataFrame(bucket_counts['counts']).rolling(window, min_periods=1).sum().to_numpy()
+    orders = pd.Series(bucket_counts['orders']).rolling(window, min_periods=1).sum().to_numpy()
+
+    trends = []
+    for antecedent, consequent in zip(rules['antecedents'], rules['consequents']):
+        antecedent, consequent = frozenset(_rule_items(antecedent)), frozenset(_rule_items(consequent))
+        if antecedent | consequent not in columns:
+            continue
+        with np.errstate(divide='ignore', invalid='ignore'):
+            support = counts[:, columns[antecedent | consequent]] / orders
+            confidence = counts[:, columns[antecedent | consequent]] / counts[:, columns[antecedent]]
+            lift = confidence / (counts[:, columns[consequent]] / orders)
+        trends.append(pd.DataFrame({
+            'period': bucket_counts['periods'].astype(str),
+            'rule': " -> ".join(_rule_labels([antecedent, consequent], item_dictionary)),
+            'support': support,
+            'confidence': confidence,
+            'lift': lift
+        }))
+
+    if not trends:
+        return pd.DataFrame(columns=['period', 'rule', 'support', 'confidence', 'lift'])
+    return pd.concat(trends, ignore_index=True)
+
+
+def dataframe_fingerprint(df):
+    """
+    Hash the content of a DataFrame (values and column names, not the index).
+
+    Parameters:
+    - df: Any DataFrame, e.g. the filtered transactions.
+
+    Returns:
+    - fingerprint: Hex digest identifying the data.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+
+def display_association_rules(rules, item_dictionary=None):
     """
     Display association rules in a more readable format.
 
     Parameters:
     - rules: DataFrame containing association rules.
+    - item_dictionary: Dict from build_item_dictionary, used to decode rules of item ids.
+
+    Returns:
+    - formatted_rules: Copy of rules with antecedents/consequents rendered as comma-joined
+      strings; rules itself is left unchanged.
     """
-    rules['antecedents'] = rules['antecedents'].apply(lambda x: ', '.join(map(str, x)))
-    rules['consequents'] = rules['consequents'].apply(lambda x: ', '.join(map(str, x)))
+    formatted_rules = rules.copy()
+    formatted_rules['antecedents'] = _rule_labels(rules['antecedents'], item_dictionary)
+    formatted_rules['consequents'] = _rule_labels(rules['consequents'], item_dictionary)
+    return formatted_rules
+
+
+def _rule_items(value):
+    """Items of one side of a rule, from a frozenset or a comma-joined string."""
+    if isinstance(value, str):
+        return tuple(item.strip() for item in value.split(','))
+    return tuple(value)
+
+
+def _csr_expand(offsets, ids, rows):
+    """Concatenate the CSR segments of rows in order; returns (position in rows, id) per element."""
+    lengths = offsets[rows + 1] - offsets[rows]
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    within = np.arange(len(owners)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owners, ids[offsets[rows[owners]] + within]
+
+
+def _postings(item_ids, rule_ids, n_items):
+    """Invert (item id, rule) pairs into CSR postings: item i owns rules[offsets[i]:offsets[i + 1]]."""
+    order = np.lexsort((rule_ids, item_ids))
+    offsets = np.zeros(n_items + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(item_ids, minlength=n_items))
+    return offsets, rule_ids[order]
+
+
+def build_rule_index(rules, item_dictionary=None):
+    """
+    Build a compact rule table with an inverted index for fast recommendation lookups.
+
+    Item names are stored once and rules refer to them by integer id, so lookups never
+    re-parse item strings; names are only decoded when results are returned. The index
+    keeps every metric column, so it can replace the rules frame: rules_frame and top_rules
+    rebuild just the rows that are shown.
+
+    Parameters:
+    - rules: DataFrame containing association rules (frozenset or comma-joined antecedents/consequents).
+    - item_dictionary: Dict from build_item_dictionary for rules of item ids; the dictionary
+      ids are used as they are instead of numbering the rule item names.
+
+    Returns:
+    - rule_index: Dict with 'items' (names by id), 'item_ids' (name -> id) and 'labels' (the
+      values the rules held per id: item ids with a dictionary, else names); both rule sides
+      in CSR layout, rule i owning antecedent_ids[antecedent_offsets[i]:antecedent_offsets[i + 1]]
+      (likewise consequent_*); a float32 array per metric column of rules (RULE_METRICS order,
+      listed in 'metrics'); 'attrs' copied from rules; and CSR postings 'by_antecedent',
+      'by_consequent' and 'by_item' as (offsets, rules) pairs listing the rules that hold an item id.
+    """
+    antecedents = [_rule_items(value) for value in rules['antecedents']]
+    consequents = [_rule_items(value) for value in rules['consequents']]
+    antecedent_sizes = np.fromiter(map(len, antecedents), dtype=np.int64, count=len(antecedents))
+    consequent_sizes = np.fromiter(map(len, consequents), dtype=np.int64, count=len(consequents))
+
+    if item_dictionary is not None:
+        items, item_ids = item_dictionary['items'], item_dictionary['item_ids']
+        name_ids = np.fromiter((item for itemset in antecedents + consequents for item in itemset), dtype=np.int32)
+    else:
+        names = np.array([item for itemset in antecedents + consequents for item in itemset], dtype=object)
+        items, name_ids = np.unique(names, return_inverse=True) if len(names) else (np.array([], dtype=object), np.array([], dtype=np.int64))
+        name_ids = name_ids.astype(np.int32)
+        item_ids = {item: item_id for item_id, item in enumerate(items.tolist())}
+    n_antecedent_ids = int(antecedent_sizes.sum())
+
+    antecedent_offsets = np.zeros(len(rules) + 1, dtype=np.int64)
+    antecedent_offsets[1:] = np.cumsum(antecedent_sizes)
+    consequent_offsets = np.zeros(len(rules) + 1, dtype=np.int64)
+    consequent_offsets[1:] = np.cumsum(consequent_sizes)
+    antecedent_ids, consequent_ids = name_ids[:n_antecedent_ids], name_ids[n_antecedent_ids:]
+
+    # Inverted postings; an item never sits on both sides of one rule
+    rule_positions = np.arange(len(rules), dtype=np.int64)
+    antecedent_rules = np.repeat(rule_positions, antecedent_sizes)
+    consequent_rules = np.repeat(rule_positions, consequent_sizes)
+
+    metrics = {metric: rules[metric].to_numpy(dtype=np.float32) for metric in RULE_METRICS if metric in rules.columns}
+    return {
+        'items': items,
+        'item_ids': item_ids,
+        'labels': np.arange(len(items), dtype=np.int32) if item_dictionary is not None else items,
+        'metrics': tuple(metrics),
+        'attrs': dict(rules.attrs),
+        'antecedent_offsets': antecedent_offsets,
+        'antecedent_ids': antecedent_ids,
+        'consequent_offsets': consequent_offsets,
+        'consequent_ids': consequent_ids,
+        **metrics,
+        'by_antecedent': _postings(antecedent_ids, antecedent_rules, len(items)),
+        'by_consequent': _postings(consequent_ids, consequent_rules, len(items)),
+        'by_item': _postings(name_ids, np.concatenate([antecedent_rules, consequent_rules]), len(items)),
+    }
+
+
+def rules_frame(rule_index, positions=None):
+    """
+    Rebuild association rules from a rule index, e.g. only the rows shown on screen.
+
+    Parameters:
+    - rule_index: Index from build_rule_index.
+    - positions: Rule positions to rebuild, in the order wanted (default all rules).
+
+    Returns:
+    - rules: DataFrame with frozenset 'antecedents'/'consequents' and the float32 metric
+      columns, in the format of generate_rules; the attrs of the indexed rules are kept.
+    """
+    if positions is None:
+        positions = np.arange(len(rule_index['antecedent_offsets']) - 1)
+    positions = np.asarray(positions, dtype=np.int64)
+    labels = rule_index['labels']
+
+    def sides(offsets, ids):
+        owners, side_ids = _csr_expand(offsets, ids, positions)
+        bounds = np.searchsorted(owners, np.arange(len(positions) + 1))
+        side_labels = labels[side_ids].tolist()
+        return [frozenset(side_labels[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    rules = pd.DataFrame({
+        'antecedents': sides(rule_index['antecedent_offsets'], rule_index['antecedent_ids']),
+        'consequents': sides(rule_index['consequent_offsets'], rule_index['consequent_ids']),
+        **{metric: rule_index[metric][positions] for metric in rule_index['metrics']}
+    })
+    rules.attrs.update(rule_index['attrs'])
     return rules
 
 
-def product_recommendation(rules, item, sort_by='confidence'):
+def top_rules(rule_index, n, by='confidence'):
+    """
+    The n best rules of a rule index, like rules.nlargest(n, by) on the rules frame.
+
+    Parameters:
+    - rule_index: Index from build_rule_index.
+    - n: Number of rules.
+    - by: Metric or list of metrics to rank by, highest first; ties keep rule order.
+
+    Returns:
+    - rules: DataFrame from rules_frame with at most n rules.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    n_rules = len(rule_index['antecedent_offsets']) - 1
+    order = np.lexsort([np.arange(n_rules)] + [-rule_index[metric] for metric in reversed(by)])
+    return rules_frame(rule_index, order[:n])
+
+
+def _rules_with_item(rule_index, postings, item):
+    """Rule positions listed for an item name in one of the postings, or None for unknown items."""
+    item_id = rule_index['item_ids'].get(item)
+    if item_id is None:
+        return None
+    offsets, rules = rule_index[postings]
+    return rules[offsets[item_id]:offsets[item_id + 1]]
+
+
+def rule_item_options(rule_index, side='antecedents', sort_by='confidence'):
+    """
+    List the items of the rules, ordered by their best rule on the metric.
+
+    Parameters:
+    - rule_index: Index from build_rule_index.
+    - side: "antecedents", or "both" for antecedent items followed by consequent-only items.
+    - sort_by: Metric used to order the rules, "confidence" or "support".
+
+    Returns:
+    - items: Unique item names in order of first appearance in the ranked rules.
+    """
+    ranked = _ranked_rules(rule_index, np.arange(len(rule_index[sort_by])), sort_by)
+    _, ids = _csr_expand(rule_index['antecedent_offsets'], rule_index['antecedent_ids'], ranked)
+    if side == 'both':
+        _, consequent_ids = _csr_expand(rule_index['consequent_offsets'], rule_index['consequent_ids'], ranked)
+        ids = np.concatenate([ids, consequent_ids])
+    _, first = np.unique(ids, return_index=True)
+    return rule_index['items'][ids[np.sort(first)]].tolist()
+
+
+def _ranked_rules(rule_index, positions, sort_by):
+    """Rule positions ordered by the metric, highest first, keeping rule order for ties."""
+    order = np.argsort(-rule_index[sort_by][positions], kind='stable')
+    return positions[order]
+
+
+def product_recommendation(rules, item, sort_by='confidence', rule_index=None, top_k=None):
     """
     Membuat rekomendasi produk berdasarkan aturan asosiasi.
 
     Parameters:
-    - rules: DataFrame yang berisi aturan asosiasi.
+    - rules: DataFrame yang berisi aturan asosiasi (boleh None jika rule_index diberikan).
     - item: Produk (antecedents) yang akan digunakan untuk membuat rekomendasi.
+    - sort_by: Urutan hasil rekomendasi berdasarkan "confidence" atau "support".
+    - rule_index: Indeks dari build_rule_index; dibuat dari rules jika tidak diberikan.
+    - top_k: Jumlah maksimum rekomendasi (default semua).
 
     Returns:
     - recommendations: List produk yang direkomendasikan beserta nilai confidence/support.
     """
+    if rule_index is None:
+        rule_index = build_rule_index(rules)
+
     recommendations = []
 
-    # Filter aturan yang relevan berdasarkan produk yang diminta (item harus ada di antecedents)
-    relevant_rules = rules[rules['antecedents'].apply(lambda x: item in [i.strip() for i in x.split(',')])]
-
-    # Ambil consequents dan confidence dari aturan relevan
-    for _, row in relevant_rules.iterrows():
-        antecedents_list = [a.strip() for a in row['antecedents'].split(',')]  # Pecah antecedents menjadi daftar
-        if item in antecedents_list:  # Pastikan produk input ada sepenuhnya di daftar antecedents
-            consequents = row['consequents']
-            confidence = row['confidence']
-            support = row['support']
-
-            # Pecah consequents menjadi produk individual jika ada beberapa produk dalam satu rule
-            recommended_items = consequents.split(',')
-            for recommended_item in recommended_items:
-                recommended_item = recommended_item.strip()  # Hilangkan spasi ekstra
-                if recommended_item != item and recommended_item not in antecedents_list:  # Hindari menambahkan produk input
-                    recommendations.append({
-                        'product': recommended_item,
-                        'confidence': confidence,
-                        'support': support
-                    })
-
-    # Sort rekomendasi berdasarkan confidence (atau bisa juga berdasarkan support jika diinginkan)
-    recommendations = sorted(recommendations, key=lambda x: x[sort_by], reverse=True)
+    # Hanya aturan yang memuat item di antecedents, langsung dari indeks
+    positions = _rules_with_item(rule_index, 'by_antecedent', item)
+    if positions is None:
+        return recommendations
+
+    items = rule_index['items']
+    antecedent_offsets, antecedent_ids = rule_index['antecedent_offsets'], rule_index['antecedent_ids']
+    consequent_offsets, consequent_ids = rule_index['consequent_offsets'], rule_index['consequent_ids']
+    for position in _ranked_rules(rule_index, positions, sort_by):
+        antecedents_list = antecedent_ids[antecedent_offsets[position]:antecedent_offsets[position + 1]]
+        for recommended_id in consequent_ids[consequent_offsets[position]:consequent_offsets[position + 1]]:
+            if items[recommended_id] != item and recommended_id not in antecedents_list:  # Hindari menambahkan produk input
+                recommendations.append({
+                    'product': items[recommended_id],
+                    'confidence': float(rule_index['confidence'][position]),
+                    'support': float(rule_index['support'][position])
+                })
+        if top_k is not None and len(recommendations) >= top_k:
+            return recommendations[:top_k]
 
     return recommendations
 
 
-def promo_recommendation(rules, item, sort_by="confidence"):
+def promo_recommendation(rules, item, sort_by="confidence", rule_index=None, top_k=None):
     """
     Menghasilkan rekomendasi promosi berdasarkan aturan asosiasi.
 
     Parameters:
-    - rules: DataFrame berisi aturan asosiasi.
+    - rules: DataFrame berisi aturan asosiasi (boleh None jika rule_index diberikan).
     - item: Produk (antecedents atau consequents) yang akan digunakan untuk membuat rekomendasi.
     - sort_by: Urutan hasil rekomendasi berdasarkan "confidence" atau "support".
+    - rule_index: Indeks dari build_rule_index; dibuat dari rules jika tidak diberikan.
+    - top_k: Jumlah maksimum rekomendasi (default semua).
 
     Returns:
     - promo: Daftar rekomendasi promo dengan confidence atau support.
     """
-    promo = []
+    if rule_index is None:
+        rule_index = build_rule_index(rules)
 
-    # Filter rules di mana produk item ada dalam antecedents atau consequents
-    relevant_rules = rules[
-        (rules['antecedents'].apply(lambda x: item in x)) | 
-        (rules['consequents'].apply(lambda x: item in x))
-    ]
+    promo = []
 
-    # Ambil antecedents, consequents, confidence, dan support dari aturan relevan
-    for _, row in relevant_rules.iterrows():
-        antecedents = row['antecedents']
-        consequents = row['consequents']
-        confidence = row['confidence']
-        support = row['support']
+    # Aturan di mana item ada di antecedents atau consequents (pencocokan persis, bukan substring)
+    positions = _rules_with_item(rule_index, 'by_item', item)
+    if positions is None:
+        return promo
 
-        # Pecah antecedents dan consequents menjadi produk individual jika ada beberapa produk dalam satu rule
-        antecedent_items = [a.strip() for a in antecedents.split(',')]
-        consequent_items = [c.strip() for c in consequents.split(',')]
+    items = rule_index['items']
+    antecedent_offsets, antecedent_ids = rule_index['antecedent_offsets'], rule_index['antecedent_ids']
+    consequent_offsets, consequent_ids = rule_index['consequent_offsets'], rule_index['consequent_ids']
+    ranked = _ranked_rules(rule_index, positions, sort_by)
+    for position in ranked[:top_k]:
+        antecedent_items = items[antecedent_ids[antecedent_offsets[position]:antecedent_offsets[position + 1]]].tolist()
+        consequent_items = items[consequent_ids[consequent_offsets[position]:consequent_offsets[position + 1]]].tolist()
 
         # Buat kombinasi promo antara antecedents dan consequents
-        if item in antecedent_items or item in consequent_items:
-            combined_items = list(set(antecedent_items + consequent_items) - {item})
-
-            # Gabungkan semua item menjadi satu string untuk promosi
-            promo_string = f"{item} + " + " + ".join(combined_items)
+        combined_items = list(set(antecedent_items + consequent_items) - {item})
 
-            # Simpan hasil rekomendasi dengan confidence dan support
-            promo.append({
-                'Paket Promo': promo_string,
-                'confidence': confidence,
-                'support': support
-            })
+        # Gabungkan semua item menjadi satu string untuk promosi
+        promo_string = f"{item} + " + " + ".join(combined_items)
 
-    # Urutkan berdasarkan kolom yang dipilih (confidence atau support)
-    promo = sorted(promo, key=lambda x: x[sort_by], reverse=True)
+        # Simpan hasil rekomendasi dengan confidence dan support
+        promo.append({
+            'Paket Promo': promo_string,
+            'confidence': float(rule_index['confidence'][position]),
+            'support': float(rule_index['support'][position])
+        })
 
     return promo
 
+def recommend_for_carts(rule_index, carts, sort_by='confidence', top_k=5, chunk_size=None):
+    """
+    Rank recommended products for many carts at once.
+
+    A rule applies to a cart when its whole antecedent set is contained in the cart.
+    Each candidate product is scored with the best applicable rule that has it as a
+    consequent; products already in the cart are skipped.
+
+    Parameters:
+    - rule_index: Index from build_rule_index.
+    - carts: Iterable of carts, each an iterable of item names.
+    - sort_by: Metric used to rank products, "confidence" or "support".
+    - top_k: Number of products returned per cart.
+    - chunk_size: Number of carts scored at once (default keeps the bit-packed rules x carts
+      match matrix within _CANDIDATE_CHUNK_BYTES).
+
+    Returns:
+    - recommendations: One list per cart of dicts with 'product', 'confidence' and 'support'.
+    """
+    item_ids = rule_index['item_ids']
+    items = rule_index['items']
+    metric = rule_index[sort_by]
+    antecedent_offsets = rule_index['antecedent_offsets']
+    antecedent_ids = rule_index['antecedent_ids']
+    antecedent_sizes = np.diff(antecedent_offsets)
+    offsets = rule_index['consequent_offsets']
+    consequent_ids = rule_index['consequent_ids']
+
+    # Rules still to be checked at each antecedent position k (those with more than k items)
+    longer = [np.flatnonzero(antecedent_sizes > k) for k in range(1, int(antecedent_sizes.max(initial=0)))]
+
+    carts = [list(cart) for cart in carts]
+    if chunk_size is None:
+        # One bit per rule x cart in the packed match matrix
+        chunk_size = max(8, 8 * _CANDIDATE_CHUNK_BYTES // max(1, len(metric)))
+    recommendations = []
+    for start in range(0, len(carts), chunk_size):
+        chunk = carts[start:start + chunk_size]
+
+        cart_rows = [row for row, cart in enumerate(chunk) for item in cart if item in item_ids]
+        cart_cols = [item_ids[item] for cart in chunk for item in cart if item in item_ids]
+        item_carts = np.zeros((len(items), len(chunk)), dtype=bool)
+        item_carts[cart_cols, cart_rows] = True
+        item_bits = np.packbits(item_carts, axis=1)
+
+        # Antecedent contained in cart <=> AND of the cart bits of every antecedent item
+        match = item_bits[antecedent_ids[antecedent_offsets[:-1]]]
+        for k, rules_k in enumerate(longer, start=1):
+            match[rules_k] &= item_bits[antecedent_ids[antecedent_offsets[rules_k] + k]]
+        match_rules, match_bytes = np.nonzero(match)
+        bits = np.unpackbits(match[match_rules, match_bytes][:, None], axis=1)
+        owners, bit = np.nonzero(bits)
+        match_rules, match_carts = match_rules[owners], match_bytes[owners] * 8 + bit
+
+        # Expand every (cart, rule) match into its consequent items
+        owners, pair_items = _csr_expand(offsets, consequent_ids, match_rules)
+        pair_carts, pair_rules = match_carts[owners], match_rules[owners]
+        fresh = ~item_carts[pair_items, pair_carts]
+        pair_carts, pair_rules, pair_items = pair_carts[fresh], pair_rules[fresh], pair_items[fresh]
+        pair_scores = metric[pair_rules]
+
+        # Best rule per (cart, item): highest score, earliest rule on ties
+        order = np.lexsort((pair_rules, -pair_scores, pair_items, pair_carts))
+        pair_carts, pair_rules, pair_items, pair_scores = pair_carts[order], pair_rules[order], pair_items[order], pair_scores[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (pair_carts[1:] != pair_carts[:-1]) | (pair_items[1:] != pair_items[:-1])
+        pair_carts, pair_rules, pair_items, pair_scores = pair_carts[first], pair_rules[first], pair_items[first], pair_scores[first]
+
+        # Rank products per cart by score, then item id, and keep the first top_k
+        order = np.lexsort((pair_items, -pair_scores, pair_carts))
+        pair_carts, pair_rules, pair_items = pair_carts[order], pair_rules[order], pair_items[order]
+        cart_starts = np.searchsorted(pair_carts, np.arange(len(chunk) + 1))
+        for row in range(len(chunk)):
+            lo, hi = cart_starts[row], min(cart_starts[row + 1], cart_starts[row] + top_k)
+            recommendations.append([
+                {
+                    'product': items[item_id],
+                    'confidence': float(rule_index['confidence'][rule]),
+                    'support': float(rule_index['support'][rule])
+                }
+                for item_id, rule in zip(pair_items[lo:hi].tolist(), pair_rules[lo:hi].tolist())
+            ])
+
+    return recommendations
+
+
+# Time series with more points than this are drawn without markers and value labels
+MAX_LABELED_POINTS = 60
+
+# Line charts with more points than this are rendered with WebGL (Scattergl) traces
+WEBGL_MIN_POINTS = 1000
+
+
 def plot_frequency_of_items(df):
-    Frequency_of_items = df.groupby(pd.Grouper(key='itemName')).size().reset_index(name='count')
+    Frequency_of_items = df.groupby(pd.Grouper(key='itemName'), observed=True).size().reset_index(name='count')
     fig = px.treemap(Frequency_of_items, path=['itemName'], values='count')
     fig.update_layout(title_text='Frequency of the Items Sold')
     fig.update_traces(textinfo="label+value")
     return fig
 
-def plot_top_items(df):
-    top_items = df['itemName'].value_counts().head(20).sort_values(ascending=True)
+def dashboard_aggregates(df):
+    """
+    Aggregate transactions once for the Analisis Data charts.
+
+    Parameters:
+    - df: DataFrame containing transaction data.
+
+    Returns:
+    - aggregates: Dict with 'orders' (distinct orderId/orderTime pairs, accepted by the
+      transaction plot_* functions in place of df) and 'item_counts' (rows per itemName,
+      accepted by plot_top_items and plot_least_sold_items).
+    """
+    orders = df[['orderId', 'orderTime']].drop_duplicates(ignore_index=True)
+    return {
+        'orders': orders,
+        'item_counts': df['itemName'].value_counts()
+    }
+
+
+def plot_top_items(df, item_counts=None):
+    """
+    Plot the Top 20 Items purchased by customers.
+
+    Parameters:
+    - df: DataFrame containing transaction data.
+    - item_counts: Precomputed df['itemName'].value_counts(), e.g. from dashboard_aggregates.
+
+    Returns:
+    - fig: A Plotly bar chart figure.
+    """
+    if item_counts is None:
+        item_counts = df['itemName'].value_counts()
+    top_items = item_counts.head(20).sort_values(ascending=True)
     fig = px.bar(y=top_items.index, x=top_items.values,  # Swap x and y
                 labels={'y': 'Items', 'x': 'Count of Items'},
                 title='Top 20 Items purchased by customers', 
                 width=1000, height=500, orientation='h')  # Set orientation to horizontal
     
-    for trace in fig.data:
-        for i, value in enumerate(trace.x):  # Now use x values for annotations
-            fig.add_annotation(
-                y=trace.y[i],
-                x=value,
-                text=f'{value}',  
-                showarrow=False,
-                arrowhead=4,
-                ax=-30,
-                ay=0,
-                xshift=20
-            )
+    fig.update_traces(texttemplate='%{x}', textposition='outside', cliponaxis=False)
     return fig
 
 
-def plot_least_sold_items(df):
+def plot_least_sold_items(df, item_counts=None):
     """
     Plot the Top 20 Least Sold Items.
     
     Parameters:
     - df: DataFrame containing transaction data.
+    - item_counts: Precomputed df['itemName'].value_counts(), e.g. from dashboard_aggregates.
     
     Returns:
     - fig: A Plotly bar chart figure.
     """
-    least_sold_items = df['itemName'].value_counts().tail(20).sort_values(ascending=False)  # Sort in ascending order for y-axis
+    if item_counts is None:
+        item_counts = df['itemName'].value_counts()
+    least_sold_items = item_counts.tail(20).sort_values(ascending=False)  # Sort in ascending order for y-axis
     fig = px.bar(y=least_sold_items.index, x=least_sold_items.values,  # Swap x and y
                 labels={'y': 'Items', 'x': 'Count of Items'},
                 title='Top 20 Least Sold Items', 
                 width=1000, height=500, orientation='h')  # Set orientation to horizontal
     
-    for trace in fig.data:
-        for i, value in enumerate(trace.x):  # Use x values for annotations (counts)
-            fig.add_annotation(
-                y=trace.y[i],
-                x=value,
-                text=f'{value}',  
-                showarrow=False,
-                arrowhead=4,
-                ax=-30,
-                ay=0,
-                xshift=10
-            )
-    
+    fig.update_traces(texttemplate='%{x}', textposition='outside', cliponaxis=False)
+
     return fig
 
 def plot_total_transactions(df, time_period='D'):
@@ -250,7 +1790,7 @@ def plot_total_transactions(df, time_period='D'):
     Plots the total transactions based on the specified time period in a line chart.
 
     Parameters:
-    - df: DataFrame containing the transaction data.
+    - df: DataFrame containing the transaction data (or dashboard_aggregates()['orders']).
     - time_period: A string specifying the time period for aggregation.
         Options include:
         'D' for daily, 
@@ -267,27 +1807,19 @@ def plot_total_transactions(df, time_period='D'):
     # Format the time period for better readability in the chart
     total_transactions['orderTime'] = total_transactions['orderTime'].astype(str)
 
-    # Create the line plot using Plotly Express
+    # Dense series (e.g. daily over several years) use WebGL and skip per-point labels
+    n_points = len(total_transactions)
     fig = px.line(total_transactions, x='orderTime', y='orderId',
                 title=f'Total Transactions Over Time ({time_period})',
                 labels={'orderTime': 'Time Period', 'orderId': 'Total Transactions'},
-                markers=True)
+                markers=n_points <= MAX_LABELED_POINTS,
+                render_mode='webgl' if n_points > WEBGL_MIN_POINTS else 'auto')
 
     fig.update_layout(xaxis_title='Time Period', yaxis_title='Total Transactions')
 
-    # Add annotations for each point in the line chart
-    for trace in fig.data:
-        for i, value in enumerate(trace.y):
-            fig.add_annotation(
-                x=trace.x[i],
-                y=value,
-                text=f'{value}',  
-                showarrow=False,
-                arrowhead=4,
-                ax=0,
-                ay=-20,
-                yshift=10
-            )
+    # Label each point through the trace text instead of one annotation per point
+    if n_points <= MAX_LABELED_POINTS:
+        fig.update_traces(mode='lines+markers+text', texttemplate='%{y}', textposition='top center')
 
     return fig
 
@@ -303,19 +1835,8 @@ def plot_monthly_total_price(df):
                 labels={'orderTime': 'Month', 'totalPrice': 'Total Omzet'})
     fig.update_layout(xaxis=dict(type='category'), xaxis_title='Month', yaxis_title='Total Omzet')
     
-    for trace in fig.data:
-        for i, value in enumerate(trace.y):
-            value_in_millions = value / 1000000
-            fig.add_annotation(
-                x=trace.x[i],
-                y=value,
-                text=f'{value_in_millions:.2f} Juta',  
-                showarrow=False,
-                arrowhead=4,
-                ax=0,
-                ay=-30,
-                yshift=10 
-            )
+    fig.update_traces(text=(monthly_total_price['totalPrice'] / 1000000).map('{:.2f} Juta'.format),
+                      textposition='outside', cliponaxis=False)
     return fig
 
 def plot_monthly_total_transaction(df):
@@ -330,23 +1851,12 @@ def plot_monthly_total_transaction(df):
                 labels={'orderTime': 'Month', 'orderId': 'Total Transaction'})
     fig.update_layout(xaxis=dict(type='category'), xaxis_title='Month', yaxis_title='Total Transaction')
     
-    for trace in fig.data:
-        for i, value in enumerate(trace.y):
-            fig.add_annotation(
-                x=trace.x[i],
-                y=value,
-                text=f'{value}',  
-                showarrow=False,
-                arrowhead=4,
-                ax=0,
-                ay=-30,
-                yshift=10 
-            )
+    fig.update_traces(texttemplate='%{y}', textposition='outside', cliponaxis=False)
     return fig
 
 def plot_weekly_total_transaction(df):
-    df['week_number'] = df['orderTime'].dt.isocalendar().week
-    weekly_total_transaction = df.groupby((df['week_number'] - 1) % 4)['orderId'].nunique().reset_index()
+    week_number = ((df['orderTime'].dt.isocalendar().week - 1) % 4).rename('week_number')
+    weekly_total_transaction = df.groupby(week_number)['orderId'].nunique().reset_index()
     weekly_total_transaction['week_number'] = weekly_total_transaction['week_number'].map({0: 1, 1: 2, 2: 3, 3: 4})
     
     fig = px.bar(weekly_total_transaction, x='week_number', y='orderId', 
@@ -354,23 +1864,12 @@ def plot_weekly_total_transaction(df):
                 labels={'week_number': 'Week', 'orderId': 'Total Transactions'})
     fig.update_xaxes(tickvals=[1, 2, 3, 4])
     
-    for trace in fig.data:
-        for i, value in enumerate(trace.y):
-            fig.add_annotation(
-                x=trace.x[i],
-                y=value,
-                text=f'{value}',  
-                showarrow=False,
-                arrowhead=4,
-                ax=0,
-                ay=-30,
-                yshift=10 
-            )
+    fig.update_traces(texttemplate='%{y}', textposition='outside', cliponaxis=False)
     return fig
 
 def plot_daily_total_transaction(df):
-    df['day_of_week'] = df['orderTime'].dt.day_name()
-    weekly_total_transaction = df.groupby('day_of_week')['orderId'].nunique().reset_index()
+    day_of_week = df['orderTime'].dt.day_name().rename('day_of_week')
+    weekly_total_transaction = df.groupby(day_of_week)['orderId'].nunique().reset_index()
     days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     weekly_total_transaction['day_of_week'] = pd.Categorical(weekly_total_transaction['day_of_week'], categories=days_order, ordered=True)
     weekly_total_transaction = weekly_total_transaction.sort_values('day_of_week')
@@ -379,23 +1878,12 @@ def plot_daily_total_transaction(df):
                 title='Total Transactions every Day of the Week in 2023',
                 labels={'day_of_week': 'Day', 'orderId': 'Total Transactions'})
     
-    for trace in fig.data:
-        for i, value in enumerate(trace.y):
-            fig.add_annotation(
-                x=trace.x[i],
-                y=value,
-                text=f'{value}',  
-                showarrow=False,
-                arrowhead=4,
-                ax=0,
-                ay=-30,
-                yshift=10 
-            )
+    fig.update_traces(texttemplate='%{y}', textposition='outside', cliponaxis=False)
     return fig
 
 def plot_hourly_total_transaction(df):
-    df['hour_of_day'] = df['orderTime'].dt.hour
-    hourly_total_transaction = df.groupby('hour_of_day')['orderId'].nunique().reset_index()
+    hour_of_day = df['orderTime'].dt.hour.rename('hour_of_day')
+    hourly_total_transaction = df.groupby(hour_of_day)['orderId'].nunique().reset_index()
     
     fig = px.bar(hourly_total_transaction, x='hour_of_day', y='orderId', 
                 title='Total Transactions every Hour of the Day in 2023',
@@ -409,92 +1897,105 @@ def plot_hourly_total_transaction(df):
         )
     )
     
-    for trace in fig.data:
-        for i, value in enumerate(trace.y):
-            fig.add_annotation(
-                x=trace.x[i],
-                y=value,
-                text=f'{value}',  
-                showarrow=False,
-                arrowhead=4,
-                ax=0,
-                ay=-30,
-                yshift=10 
-            )
+    fig.update_traces(texttemplate='%{y}', textposition='outside', cliponaxis=False)
     return fig
 
 
-def generate_pyvis_graph(rules):
+# Rule graphs draw at most this many rules, the strongest by lift then confidence
+GRAPH_MAX_EDGES = 300
+
+# Graphs with more nodes than this are shown with the precomputed layout and physics off
+GRAPH_PHYSICS_MAX_NODES = 60
+
+
+def _rule_labels(values, item_dictionary=None):
+    """Comma-joined labels of rule sides; item ids are decoded (in name order) when a dictionary is given."""
+    if item_dictionary is not None:
+        items = item_dictionary['items']
+        return [", ".join(items[sorted(value)]) if isinstance(value, frozenset) else value for value in values]
+    return [", ".join(map(str, value)) if isinstance(value, frozenset) else value for value in values]
+
+
+def generate_pyvis_graph(rules, max_edges=GRAPH_MAX_EDGES, physics_max_nodes=GRAPH_PHYSICS_MAX_NODES, item_dictionary=None):
     """
     Generate a Pyvis graph from the association rules DataFrame and return the HTML representation.
-    """
-    graph = rules[['antecedents', 'consequents', 'confidence', 'antecedent support', 'consequent support']]
-    
-    # Create a directed graph
-    G = nx.DiGraph()
 
-    # Add nodes and edges
-    for index, row in graph.iterrows():
-        antecedents = ", ".join(list(row['antecedents'])) if isinstance(row['antecedents'], frozenset) else row['antecedents']
-        consequents = ", ".join(list(row['consequents'])) if isinstance(row['consequents'], frozenset) else row['consequents']
-        weight = round(row['confidence'], 2)
-        ant_support = row['antecedent support']
-        con_support = row['consequent support']
-
-        G.add_node(antecedents, size=ant_support * 100, title=f"Support: {ant_support}")
-        G.add_node(consequents, size=con_support * 100, title=f"Support: {con_support}")
-        G.add_edge(antecedents, consequents, weight=weight, title=f"Confidence: {weight}")
-
-    # Normalize edge sizes
-    max_confidence = max(graph['confidence'])
-    min_confidence = min(graph['confidence'])
-
-    # Avoid division by zero
-    if max_confidence == min_confidence:
-        for u, v, d in G.edges(data=True):
-            G[u][v]['value'] = 1 
-    else:
-        for u, v, d in G.edges(data=True):
-            weight = d['weight']
-            value = 1 + 9 * (weight - min_confidence) / (max_confidence - min_confidence)
-            G[u][v]['value'] = value
-
-    # Create a Pyvis Network
-    net = Network(notebook=True, directed=True, cdn_resources='in_line')
+    Parameters:
+    - rules: DataFrame containing association rules (frozenset or comma-joined itemsets).
+    - max_edges: Maximum number of rules drawn, the strongest by lift then confidence.
+    - physics_max_nodes: Larger graphs keep the server-side layout with physics disabled.
+    - item_dictionary: Dict from build_item_dictionary, used to label rules of item ids.
 
-    # Load the NetworkX graph into Pyvis Network
-    net.from_nx(G)
+    Returns:
+    - html: Pyvis HTML page loading vis.js from the CDN.
+    """
+    rank_by = [column for column in ('lift', 'confidence') if column in rules.columns]
+    graph = rules.nlargest(max_edges, rank_by) if len(rules) > max_edges else rules
+
+    # One row per (antecedent, consequent) edge; later rules overwrite earlier ones like nx.DiGraph
+    antecedents = _rule_labels(graph['antecedents'], item_dictionary)
+    consequents = _rule_labels(graph['consequents'], item_dictionary)
+    edges = pd.DataFrame({
+        'source': antecedents,
+        'target': consequents,
+        'confidence': graph['confidence'].to_numpy(dtype=np.float64)
+    }).drop_duplicates(['source', 'target'], keep='last')
+
+    # Nodes in order of first appearance, attributes from their last appearance
+    nodes = pd.DataFrame({
+        'id': np.column_stack([antecedents, consequents]).ravel(),
+        'support': np.column_stack([graph['antecedent support'], graph['consequent support']]).ravel()
+    }).groupby('id', sort=False)['support'].last()
+
+    # Normalize edge sizes (avoid division by zero when all confidences are equal)
+    weight = edges['confidence'].round(2)
+    span = edges['confidence'].max() - edges['confidence'].min()
+    value = 1 + 9 * (weight - edges['confidence'].min()) / span if span > 0 else pd.Series(1.0, index=edges.index)
+
+    # Server-side layout so the browser does not have to simulate large graphs
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes.index)
+    G.add_edges_from(zip(edges['source'], edges['target']))
+    positions = nx.spring_layout(G, seed=0, scale=max(200.0, 60.0 * np.sqrt(len(nodes)))) if len(G) else {}
+    physics = len(nodes) <= physics_max_nodes
+
+    net = Network(notebook=True, directed=True, cdn_resources='remote')
+    for node, support in zip(nodes.index, nodes.tolist()):
+        x, y = positions[node]
+        net.add_node(node, label=node, size=int(support * 100), title=f"Support: {support}", x=float(x), y=float(y))
+    for source, target, edge_weight, edge_value in zip(edges['source'], edges['target'], weight.tolist(), value.tolist()):
+        net.add_edge(source, target, weight=edge_weight, value=edge_value, title=f"Confidence: {edge_weight}")
 
     # Customize the layout and appearance
-    net.set_options("""
-    var options = {
-        "nodes": {
-            "scaling": {
+    net.set_options(f"""
+    var options = {{
+        "nodes": {{
+            "scaling": {{
                 "min": 10,
                 "max": 50
-            }
-        },
-        "edges": {
-            "scaling": {
-                "label": {
+            }}
+        }},
+        "edges": {{
+            "scaling": {{
+                "label": {{
                     "enabled": true
-                }
-            },
-            "smooth": true
-        },
-        "interaction": {
+                }}
+            }},
+            "smooth": {str(physics).lower()}
+        }},
+        "interaction": {{
             "hover": true
-        },
-        "physics": {
-            "enabled": true
-        }
-    }
+        }},
+        "physics": {{
+            "enabled": {str(physics).lower()}
+        }}
+    }}
     """)
 
     # Return the HTML of the network
     return net.generate_html()
 
-def plot_top_association_rules(rules, metric='confidence', top_n=10):
+def plot_top_association_rules(rules, metric='confidence', top_n=10, item_dictionary=None):
     """
     Generate a bar chart for the top association rules based on the specified metric.
 
@@ -502,6 +2003,7 @@ def plot_top_association_rules(rules, metric='confidence', top_n=10):
     - rules: DataFrame containing association rules with metrics (confidence, lift, support).
     - metric: The metric to rank the rules by. Options: 'confidence', 'lift', 'support'.
     - top_n: The number of top rules to display in the chart.
+    - item_dictionary: Dict from build_item_dictionary, used to label rules of item ids.
 
     Returns:
     - fig: Plotly bar chart figure.
@@ -510,7 +2012,11 @@ def plot_top_association_rules(rules, metric='confidence', top_n=10):
     top_rules = rules.nlargest(top_n, metric)
     
     # Create labels for each rule by combining antecedents and consequents
-    top_rules['rule'] = top_rules.apply(lambda row: f"{', '.join(list(row['antecedents'])) if isinstance(row['antecedents'], frozenset) else row['antecedents']} -> {', '.join(list(row['consequents'])) if isinstance(row['consequents'], frozenset) else row['consequents']}", axis=1)
+    top_rules['rule'] = [
+        f"{antecedent} -> {consequent}"
+        for antecedent, consequent in zip(_rule_labels(top_rules['antecedents'], item_dictionary),
+                                          _rule_labels(top_rules['consequents'], item_dictionary))
+    ]
     top_rules = top_rules.sort_values(by=metric, ascending=True)
 
     # Create the bar chart
@@ -531,4 +2037,23 @@ def plot_top_association_rules(rules, metric='confidence', top_n=10):
     # Add text annotations to each bar
     fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
     
-    return fig
\ No newline at end of file
+    return fig
+
+
+def plot_rule_trends(trends, metric='confidence'):
+    """
+    Plot how association rules change over time buckets.
+
+    Parameters:
+    - trends: DataFrame from rule_trends.
+    - metric: Metric shown on the y axis. Options: 'confidence', 'lift', 'support'.
+
+    Returns:
+    - fig: Plotly line chart figure.
+    """
+    fig = px.line(trends, x='period', y=metric, color='rule', markers=True,
+                render_mode='webgl' if len(trends) > WEBGL_MIN_POINTS else 'auto',
+                title=f'Association Rule {metric.capitalize()} over Time',
+                labels={'period': 'Time Period', metric: metric.capitalize(), 'rule': 'Association Rule'})
+    fig.update_layout(xaxis=dict(type='category'))
+    return fig